@@ -1,135 +1,437 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, File, UploadFile, Form, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List
 import shutil
 import os
+import io
 import asyncio
-import json
-import zipfile
+import hashlib
 import tempfile
+import orjson
+import zipfile
 from pathlib import Path
-from utils.context_caching import analyze_bulk_resumes_parallel
+from utils.context_caching import analyze_bulk_resumes_parallel_async, sha256_file
 from utils import db_manager
+from utils.prefilter import parse_skills
 
 router = APIRouter()
 
+# Analysis fields returned by /results/, with their defaults when missing.
+# The defaults are shared between rows and must never be mutated.
+_ESSENTIAL_FIELDS = (
+    ("candidate_name", None),
+    ("position_applied", None),
+    ("company", None),
+    ("overall_fit_score", None),
+    ("recommendation", None),
+    ("fit_level", None),
+    ("key_strengths", []),
+    ("major_concerns", []),
+    ("skills_assessment", {}),
+    ("experience_fit", {}),
+    ("hiring_decision_factors", {}),
+    ("evaluation_timestamp", None),
+)
+_ESSENTIAL_KEYS, _ESSENTIAL_DEFAULTS = zip(*_ESSENTIAL_FIELDS)
+
+# Uploaded JDs and extracted resumes are written here, each request into its
+# own subdirectory; created once at import rather than checked on every request
+_UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+# Starlette keeps uploads of up to this many bytes in memory and spools larger
+# ones to a temporary file
+_SPOOL_MAX_SIZE = 1 << 20
+
+# Limits on what a single resumes zip may expand to
+MAX_ZIP_FILES = int(os.getenv("MAX_ZIP_FILES", "2000"))
+MAX_ZIP_ENTRY_BYTES = 100 << 20
+MAX_ZIP_TOTAL_BYTES = 2 << 30
+MAX_ZIP_COMPRESSION_RATIO = 100
+
+# Zips whose PDFs add up to at most this many bytes are extracted in memory
+# and never written to disk
+RESUME_MEMORY_BYTES = int(os.getenv("RESUME_MEMORY_BYTES", str(64 << 20)))
+
+# Caps how many upload requests extract and analyze resumes at once, bounding
+# disk, memory and analyzer threads when several large batches arrive together
+_UPLOAD_SEMAPHORE = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_UPLOADS", "4")))
+
+# Resume analysis is network-bound (Gemini uploads and generation), so the
+# per-request coroutine fan-out can comfortably exceed the CPU count
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "8"))
+
+
+def _save_upload(upload: UploadFile, dest):
+    """
+    Persist an uploaded file to dest.
+
+    Uploads large enough for Starlette to have spooled them to disk are copied
+    in-kernel with os.sendfile; smaller ones are still in memory and get a
+    buffered copy (asking those for a fileno() would force them onto disk first).
+    """
+    src = upload.file
+    # upload.size is None when unknown; then try fileno() and let it decide
+    on_disk = upload.size is None or upload.size > _SPOOL_MAX_SIZE
+    if on_disk and hasattr(os, "sendfile"):
+        try:
+            src_fd = src.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+        if src_fd is not None:
+            src.flush()
+            size = os.fstat(src_fd).st_size
+            with open(dest, "wb") as dst:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            return
+
+    src.seek(0)
+    with open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst, length=1 << 20)
+
+
+def _request_dir():
+    """A new directory under _UPLOAD_DIR for one request's files, so concurrent requests never share paths"""
+    return Path(tempfile.mkdtemp(dir=_UPLOAD_DIR))
+
+
+async def _save_request_files(request_dir, *jobs):
+    """
+    Run the blocking save/extract jobs for one request concurrently, off the event loop.
+
+    Returns their results in order. If any job fails, waits for the others to
+    finish and then removes request_dir, which holds only this request's files,
+    before re-raising the first error.
+    """
+    results = await asyncio.gather(*(asyncio.to_thread(*job) for job in jobs), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            shutil.rmtree(request_dir, ignore_errors=True)
+            raise result
+    return results
+
+
+def _safe_filename(filename, default="upload"):
+    """Strip any directory components (including Windows-style ones) from a client-supplied filename"""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    return name if name not in ("", ".", "..") else default
+
+
+def _extract_resumes(resumes_zip: UploadFile, upload_folder):
+    """
+    Extract the PDF resumes from an uploaded zip.
+
+    Entries with identical contents are only kept once. Returns a dict mapping
+    each unique resume path to the SHA-256 of its contents, a dict mapping each
+    duplicate's path to the path of the resume it duplicates, and a dict of
+    resume contents held in memory. Archives whose PDFs fit in
+    RESUME_MEMORY_BYTES are kept entirely in memory and nothing is written to
+    upload_folder (their paths are only names); larger ones are streamed to
+    disk there. Archives that exceed the MAX_ZIP_* limits or look like zip
+    bombs are rejected with HTTP 413.
+    """
+    # Read straight from the uploaded zip; the spooled upload file is already
+    # seekable, so the archive itself is never copied into uploads/
+    written = []
+    paths_by_hash = {}
+    aliases = {}
+    contents = {}
+    total_bytes = 0
+    part_path = None
+    resumes_zip.file.seek(0)
+    try:
+        zip_ref = zipfile.ZipFile(resumes_zip.file, 'r')
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="resumes_zip is not a valid zip file")
+
+    try:
+        with zip_ref:
+            # Only PDF entries are kept, skipping directories, macOS metadata
+            # and anything else
+            entries = [
+                info for info in zip_ref.infolist()
+                if not info.is_dir() and not info.filename.startswith('__MACOSX') and info.filename.lower().endswith('.pdf')
+            ]
+            in_memory = sum(info.file_size for info in entries) <= RESUME_MEMORY_BYTES
+
+            for info in entries:
+                # Bound the work a single request can cause before touching the entry
+                if len(paths_by_hash) + len(aliases) >= MAX_ZIP_FILES:
+                    raise HTTPException(status_code=413, detail=f"Zip contains more than {MAX_ZIP_FILES} resumes")
+                if info.file_size > MAX_ZIP_ENTRY_BYTES:
+                    raise HTTPException(status_code=413, detail=f"{info.filename} exceeds {MAX_ZIP_ENTRY_BYTES} bytes")
+                if info.file_size > max(info.compress_size, 1) * MAX_ZIP_COMPRESSION_RATIO:
+                    raise HTTPException(status_code=413, detail=f"{info.filename} has a suspicious compression ratio")
+                total_bytes += info.file_size
+                if total_bytes > MAX_ZIP_TOTAL_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Zip expands to more than {MAX_ZIP_TOTAL_BYTES} bytes")
+
+                name = _safe_filename(info.filename, default="")
+                if not name:
+                    continue
+
+                dest_path = os.fspath(upload_folder / f"resume_{len(paths_by_hash) + len(aliases)}_{name}")
+
+                if in_memory:
+                    # Hand the bytes to the analyzer directly instead of
+                    # writing them out only for it to read them back
+                    data = zip_ref.read(info)
+                    content_hash = hashlib.sha256(data).hexdigest()
+                    if content_hash in paths_by_hash:
+                        aliases[dest_path] = paths_by_hash[content_hash]
+                        continue
+                    contents[dest_path] = data
+                    paths_by_hash[content_hash] = dest_path
+                    continue
+
+                part_path = dest_path + ".part"
+                # Hash while copying so deduplication costs no extra read. Keep
+                # this a plain open()/write copy: metadata-preserving copies
+                # (shutil.copy2/copystat) only add stat/utime/chmod syscalls for
+                # files the analyzer reads once
+                digest = hashlib.sha256()
+                with zip_ref.open(info) as src, open(part_path, "wb") as dst:
+                    for chunk in iter(lambda: src.read(1 << 20), b""):
+                        digest.update(chunk)
+                        dst.write(chunk)
+
+                content_hash = digest.hexdigest()
+                if content_hash in paths_by_hash:
+                    os.unlink(part_path)
+                    aliases[dest_path] = paths_by_hash[content_hash]
+                    continue
+
+                os.replace(part_path, dest_path)
+                paths_by_hash[content_hash] = dest_path
+                written.append(dest_path)
+    except BaseException as e:
+        # Don't leave a partial batch behind in upload_folder, whatever cut the
+        # extraction short (a rejected entry, a corrupt one, a cancelled request)
+        for path in written:
+            os.unlink(path)
+        if part_path is not None and os.path.exists(part_path):
+            os.unlink(part_path)
+        # A corrupt entry (bad CRC, truncated data) only surfaces once it is read
+        if isinstance(e, zipfile.BadZipFile):
+            raise HTTPException(status_code=400, detail="resumes_zip is not a valid zip file") from e
+        raise
+
+    return {path: content_hash for content_hash, path in paths_by_hash.items()}, aliases, contents
+
+
+def _parse_analysis(value):
+    """Parse an analysis JSON string into a dictionary, keeping it as a string if parsing fails"""
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return value
+
+
+def _format_results(analysis_results):
+    """Convert the analyzer's {resume_path: result_json} dictionary into a list of objects"""
+    return [
+        {"resume_file": os.path.basename(key), "analysis": _parse_analysis(value)}
+        for key, value in analysis_results.items()
+    ]
+
+
+def _clean_result(result):
+    """Reduce a stored analysis record to the essential fields returned by /results/"""
+    try:
+        # Parse the result JSON to get the actual analysis data; drivers that
+        # decode jsonb already hand back a dict, which skips parsing entirely
+        raw = result.get('result_json')
+        analysis_data = raw if isinstance(raw, dict) else (orjson.loads(raw) if raw else {})
+
+        # Create cleaned result with only essential fields; map/zip keep the
+        # per-field lookups in C instead of a Python-level loop
+        cleaned_result = {
+            "analysis_id": result.get('id'),
+            "processed_at": result.get('processed_at'),
+        }
+        cleaned_result.update(zip(_ESSENTIAL_KEYS, map(analysis_data.get, _ESSENTIAL_KEYS, _ESSENTIAL_DEFAULTS)))
+        return cleaned_result
+
+    except (orjson.JSONDecodeError, KeyError):
+        # If there's an issue parsing, include basic info
+        return _unparsed_result(result)
+
+
+def _unparsed_result(result):
+    """The basic info /results/ returns for a stored analysis that could not be parsed"""
+    return {
+        "analysis_id": result.get('id'),
+        "processed_at": result.get('processed_at'),
+        "error": "Failed to parse analysis data"
+    }
+
+
+async def _stream_user_results(user_uuid, analysis_results):
+    """Yield the /results/ response body one cleaned analysis at a time"""
+    yield (
+        b'{"user_uuid":' + orjson.dumps(user_uuid)
+        + b',"total_results":' + str(len(analysis_results)).encode()
+        + b',"analyses":['
+    )
+    for index, result in enumerate(analysis_results):
+        try:
+            row = orjson.dumps(_clean_result(result))
+        except Exception as e:
+            # The 200 has already been sent, so an exception here would cut the
+            # body short; report the malformed row (e.g. a non-object
+            # result_json) the way _clean_result reports unparsable JSON
+            print(f"Error serializing analysis {result.get('id')}: {e}")
+            row = orjson.dumps(_unparsed_result(result))
+        yield row if index == 0 else b"," + row
+    yield b"]}"
+
+
+async def _analyze_resumes(jd_filename, resume_hashes, user_uuid, resume_contents=None, on_result=None, required_skills=()):
+    """
+    Analyze resumes against the JD, reusing cached results for unchanged (JD, resume) pairs.
+
+    resume_hashes maps each resume path to the SHA-256 of its contents, and
+    resume_contents optionally holds resumes already in memory. The parallel
+    analyzer serves cached pairs itself and sizes its concurrency to the batch,
+    calling on_result(resume_path, result) as each result becomes known.
+    Resumes mentioning too few of required_skills are rejected without Gemini.
+    """
+    jd_hash = await asyncio.to_thread(sha256_file, jd_filename)
+    analysis_results = await analyze_bulk_resumes_parallel_async(
+        jd_filename,
+        list(resume_hashes),
+        username=user_uuid,
+        max_workers=max(1, min(ANALYSIS_WORKERS, len(resume_hashes))),
+        jd_hash=jd_hash,
+        resume_contents=resume_contents,
+        resume_hashes=resume_hashes,
+        on_result=on_result,
+        required_skills=required_skills
+    )
+
+    # Keep the caller's resume order regardless of which results were cached
+    return {path: analysis_results.get(path) for path in resume_hashes}
+
+async def _stream_bulk_results(jd_filename, resume_hashes, duplicate_resumes, user_uuid, resume_contents, required_skills):
+    """Yield one NDJSON line per resume, in the order the analyses finish"""
+    queue = asyncio.Queue()
+    duplicates_of = {}
+    for duplicate_path, original_path in duplicate_resumes.items():
+        duplicates_of.setdefault(original_path, []).append(duplicate_path)
+
+    def _lines(resume_path, result):
+        analysis = _parse_analysis(result)
+        return b"".join(
+            orjson.dumps({"resume_file": os.path.basename(path), "analysis": analysis}) + b"\n"
+            for path in (resume_path, *duplicates_of.get(resume_path, ()))
+        )
+
+    async with _UPLOAD_SEMAPHORE:
+        task = asyncio.create_task(_analyze_resumes(
+            jd_filename, resume_hashes, user_uuid, resume_contents,
+            on_result=lambda path, result: queue.put_nowait((path, result)),
+            required_skills=required_skills
+        ))
+        # None marks the end of the stream once the analyzer returns or fails
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            streamed = set()
+            while (item := await queue.get()) is not None:
+                streamed.add(item[0])
+                yield _lines(*item)
+
+            # Resumes that failed before reaching the pipeline (e.g. a JD upload
+            # error) only appear in the final results
+            try:
+                final_results = await task
+            except Exception as e:
+                # The response has already started, so an exception would abort
+                # it mid-body; report the failure on every resume still owed instead
+                print(f"Error analyzing bulk upload: {e}")
+                final_results = dict.fromkeys(resume_hashes, f"Error: {str(e)}")
+            for resume_path, result in final_results.items():
+                if resume_path not in streamed:
+                    yield _lines(resume_path, result)
+        finally:
+            # Stop analyzing if the client disconnects mid-stream
+            task.cancel()
+
 @router.post("/bulk-upload/")
-async def bulk_upload_files(jd: UploadFile = File(...), resumes_zip: UploadFile = File(...), user_uuid: str = Form(...)):
+async def bulk_upload_files(jd: UploadFile = File(...), resumes_zip: UploadFile = File(...), user_uuid: str = Form(...), required_skills: str = Form(""), accept: str = Header("")):
     """
     Uploads a job description and a zip file containing multiple resumes for bulk processing.
 
     - **jd**: The job description PDF file.
     - **resumes_zip**: A zip file containing multiple resume PDF files.
     - **user_uuid**: Unique identifier for the user submitting the analysis
+    - **required_skills**: Optional comma-separated required skills; resumes mentioning
+      too few of them (under 30% by default) are rejected without an LLM analysis
+
+    Clients sending `Accept: application/x-ndjson` receive one
+    `{"resume_file", "analysis"}` JSON line per resume as soon as it is analyzed,
+    instead of a single response once the whole batch is done.
     """
-    upload_folder = "uploads"
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-
-    # Save JD file
-    jd_filename = os.path.join(upload_folder, jd.filename)
-    with open(jd_filename, "wb") as buffer:
-        shutil.copyfileobj(jd.file, buffer)
-
-    # Save and extract zip file
-    zip_filename = os.path.join(upload_folder, resumes_zip.filename)
-    with open(zip_filename, "wb") as buffer:
-        shutil.copyfileobj(resumes_zip.file, buffer)
-
-    # Extract resumes from zip
-    resume_filenames = []
-    with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-        # Create a temporary directory for extraction
-        with tempfile.TemporaryDirectory() as temp_dir:
-            zip_ref.extractall(temp_dir)
-            
-            # Find all PDF files in the extracted directory (recursive)
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    if file.lower().endswith('.pdf'):
-                        full_path = os.path.join(root, file)
-                        # Copy to uploads directory
-                        dest_path = os.path.join(upload_folder, f"resume_{len(resume_filenames)}_{file}")
-                        shutil.copy2(full_path, dest_path)
-                        resume_filenames.append(dest_path)
-
-    # Process the resumes against the job description in a separate thread
-    analysis_results = await asyncio.to_thread(
-        analyze_bulk_resumes_parallel,
-        jd_filename,
-        resume_filenames,
-        username=user_uuid
-    )
+    async with _UPLOAD_SEMAPHORE:
+        # Save the JD and extract the resumes concurrently, off the event loop
+        request_dir = _request_dir()
+        jd_filename = os.fspath(request_dir / _safe_filename(jd.filename))
+        _, (resume_hashes, duplicate_resumes, resume_contents) = await _save_request_files(
+            request_dir,
+            (_save_upload, jd, jd_filename),
+            (_extract_resumes, resumes_zip, request_dir)
+        )
 
-    # Convert the dictionary of results into a list of objects
-    formatted_results = []
-    for key, value in analysis_results.items():
-        try:
-            # Parse the JSON string into a dictionary
-            analysis_data = json.loads(value)
-            formatted_results.append({
-                "resume_file": os.path.basename(key),
-                "analysis": analysis_data
-            })
-        except json.JSONDecodeError:
-            # If parsing fails, keep it as a string
-            formatted_results.append({
-                "resume_file": os.path.basename(key),
-                "analysis": value
-            })
-
-    return {"analysis_results": formatted_results}
+        if "application/x-ndjson" in accept:
+            # The stream takes its own semaphore slot for the analysis, which
+            # outlives this handler. main.py keeps gzip off NDJSON responses so
+            # each line is flushed as soon as it is ready
+            return StreamingResponse(
+                _stream_bulk_results(jd_filename, resume_hashes, duplicate_resumes, user_uuid, resume_contents, parse_skills(required_skills)),
+                media_type="application/x-ndjson"
+            )
+
+        # Analyze the unique resumes against the job description on the event loop
+        analysis_results = await _analyze_resumes(jd_filename, resume_hashes, user_uuid, resume_contents, required_skills=parse_skills(required_skills))
+
+        # Duplicates share the result of the resume they duplicate
+        for duplicate_path, original_path in duplicate_resumes.items():
+            analysis_results[duplicate_path] = analysis_results.get(original_path)
+
+    return {"analysis_results": _format_results(analysis_results)}
 
 @router.post("/upload/")
-async def upload_single_files(jd: UploadFile = File(...), resume: UploadFile = File(...), user_uuid: str = Form(...)):
+async def upload_single_files(jd: UploadFile = File(...), resume: UploadFile = File(...), user_uuid: str = Form(...), required_skills: str = Form("")):
     """
     Uploads a job description and a single resume file (PDF or DOCX).
 
     - **jd**: The job description PDF file.
     - **resume**: A single resume file (PDF or DOCX).
     - **user_uuid**: Unique identifier for the user submitting the analysis
+    - **required_skills**: Optional comma-separated required skills; a resume mentioning
+      too few of them (under 30% by default) is rejected without an LLM analysis
     """
-    upload_folder = "uploads"
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-
-    # Save JD file
-    jd_filename = os.path.join(upload_folder, jd.filename)
-    with open(jd_filename, "wb") as buffer:
-        shutil.copyfileobj(jd.file, buffer)
-
-    # Save resume file
-    resume_filename = os.path.join(upload_folder, resume.filename)
-    with open(resume_filename, "wb") as buffer:
-        shutil.copyfileobj(resume.file, buffer)
+    async with _UPLOAD_SEMAPHORE:
+        # Save the JD and resume concurrently, off the event loop
+        request_dir = _request_dir()
+        jd_filename = os.fspath(request_dir / _safe_filename(jd.filename))
+        resume_filename = os.fspath(request_dir / _safe_filename(resume.filename))
+        await _save_request_files(
+            request_dir,
+            (_save_upload, jd, jd_filename),
+            (_save_upload, resume, resume_filename)
+        )
 
-    resume_filenames = [resume_filename]
+        resume_hashes = {resume_filename: await asyncio.to_thread(sha256_file, resume_filename)}
 
-    # Process the resume against the job description in a separate thread
-    analysis_results = await asyncio.to_thread(
-        analyze_bulk_resumes_parallel,
-        jd_filename,
-        resume_filenames,
-        username=user_uuid
-    )
+        # Analyze the resume against the job description on the event loop
+        analysis_results = await _analyze_resumes(jd_filename, resume_hashes, user_uuid, required_skills=parse_skills(required_skills))
 
-    # Convert the dictionary of results into a list of objects
-    formatted_results = []
-    for key, value in analysis_results.items():
-        try:
-            # Parse the JSON string into a dictionary
-            analysis_data = json.loads(value)
-            formatted_results.append({
-                "resume_file": os.path.basename(key),
-                "analysis": analysis_data
-            })
-        except json.JSONDecodeError:
-            # If parsing fails, keep it as a string
-            formatted_results.append({
-                "resume_file": os.path.basename(key),
-                "analysis": value
-            })
-
-    return {"analysis_results": formatted_results}
+    return {"analysis_results": _format_results(analysis_results)}
 
 
 @router.get("/results/{user_uuid}")
@@ -141,60 +443,17 @@ async def get_user_results(user_uuid: str):
     - **user_uuid**: The unique identifier for the user whose results you want to retrieve
     """
     try:
-        # Get user data from PostgreSQL database
-        user_data = await asyncio.to_thread(db_manager.get_user_data, user_uuid)
-        
-        if not user_data:
-            raise HTTPException(status_code=404, detail=f"No data found for user UUID: {user_uuid}")
-        
-        # Extract analysis results from user data
-        analysis_results = user_data.get('data', {}).get('analysis_results', [])
+        # Get the user's analysis results from PostgreSQL, newest first
+        analysis_results = await asyncio.to_thread(db_manager.get_user_analysis_results, user_uuid)
         
         if not analysis_results:
             raise HTTPException(status_code=404, detail=f"No analysis results found for user UUID: {user_uuid}")
         
-        # Clean the results - remove unnecessary internal fields
-        cleaned_results = []
-        for result in analysis_results:
-            try:
-                # Parse the result JSON to get the actual analysis data
-                if isinstance(result.get('result_json'), str):
-                    analysis_data = json.loads(result['result_json'])
-                else:
-                    analysis_data = result.get('result_json', {})
-                
-                # Create cleaned result with only essential fields
-                cleaned_result = {
-                    "analysis_id": result.get('id'),
-                    "processed_at": result.get('processed_at'),
-                    "candidate_name": analysis_data.get('candidate_name'),
-                    "position_applied": analysis_data.get('position_applied'),
-                    "company": analysis_data.get('company'),
-                    "overall_fit_score": analysis_data.get('overall_fit_score'),
-                    "recommendation": analysis_data.get('recommendation'),
-                    "fit_level": analysis_data.get('fit_level'),
-                    "key_strengths": analysis_data.get('key_strengths', []),
-                    "major_concerns": analysis_data.get('major_concerns', []),
-                    "skills_assessment": analysis_data.get('skills_assessment', {}),
-                    "experience_fit": analysis_data.get('experience_fit', {}),
-                    "hiring_decision_factors": analysis_data.get('hiring_decision_factors', {}),
-                    "evaluation_timestamp": analysis_data.get('evaluation_timestamp')
-                }
-                cleaned_results.append(cleaned_result)
-                
-            except (json.JSONDecodeError, KeyError) as e:
-                # If there's an issue parsing, include basic info
-                cleaned_results.append({
-                    "analysis_id": result.get('id'),
-                    "processed_at": result.get('processed_at'),
-                    "error": "Failed to parse analysis data"
-                })
-        
-        return {
-            "user_uuid": user_uuid,
-            "total_results": len(cleaned_results),
-            "analyses": cleaned_results
-        }
+        # Stream the cleaned rows instead of building the whole list in memory
+        return StreamingResponse(
+            _stream_user_results(user_uuid, analysis_results),
+            media_type="application/json"
+        )
         
     except HTTPException:
         raise
@@ -1,10 +1,63 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from Api import routes as api_routes
+from utils import db_manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # asyncio.to_thread runs on the loop's default executor; give it one fixed,
+    # named pool instead of the implicit min(32, cpu + 4) one so the routes'
+    # file and analysis work doesn't oversubscribe the analyzer's own threads
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("ANALYZE_THREADS", "8")), thread_name_prefix="analyze")
+    )
+    # Create or migrate the schema once per process, before serving requests
+    await asyncio.to_thread(db_manager.init_db)
+    yield
+
+
+class StreamingAwareGZipMiddleware:
+    """GZipMiddleware that leaves application/x-ndjson streams uncompressed"""
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        # The bulk route only streams NDJSON to clients that ask for it; gzip
+        # would buffer those lines instead of flushing each one as it is ready
+        if scope["type"] == "http" and b"application/x-ndjson" in dict(scope["headers"]).get(b"accept", b""):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
 
-app = FastAPI()
+# Serialize route return values with orjson instead of the stdlib json encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# Analysis payloads repeat the same keys for every resume and compress well;
+# small responses aren't worth the CPU
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 app.include_router(api_routes.router)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Serve from several worker processes, each with its own event loop, pool
+    # and caches. Workers need the app as an import string; "auto" picks
+    # uvloop and httptools when installed (uvicorn[standard]) and falls back
+    # to asyncio and h11, e.g. on Windows.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        loop="auto",
+        http="auto",
+    )
@@ -0,0 +1,11 @@
+"""
+Create or migrate the PostgreSQL schema used by the backend.
+
+The API does this itself on startup; run it ahead of a deploy with
+`python -m scripts.init_db` from the Backend directory.
+"""
+from utils import db_manager
+
+
+if __name__ == "__main__":
+    db_manager.init_db()
@@ -0,0 +1,104 @@
+"""
+Local SQLite cache of analysis results, checked before the shared PostgreSQL
+analysis_cache so repeat (JD, resume) pairs are served from this machine's disk.
+
+Entries are keyed by a 16-byte BLAKE2b digest of the analysis cache key, expire
+ANALYSIS_CACHE_TTL_DAYS after they were stored like the PostgreSQL cache, and the
+least recently used ones are evicted beyond LOCAL_CACHE_MAX_ENTRIES.
+
+Usage:
+    from utils import cache
+    cache.put_many({cache_key: result_json})
+    cached = cache.get_many([cache_key])
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+LOCAL_CACHE_PATH = Path(os.getenv(
+    "LOCAL_ANALYSIS_CACHE",
+    str(Path(os.getenv("RESUME_MATCH_CACHE_DIR", str(Path.home() / ".resume_match_cache"))) / "analysis_cache.db")
+))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "50000"))
+LOCAL_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL_DAYS", "30")) * 24 * 3600  # seconds
+
+# A hit only rewrites an entry's last_used time once it is this stale, so a
+# read-mostly cache isn't turned into one write per read; eviction order only
+# needs to be roughly right
+LRU_TOUCH_INTERVAL = 3600  # seconds
+
+# Keys per IN (...) query, well below SQLite's host parameter limit (999 before 3.32)
+QUERY_CHUNK_SIZE = 500
+
+# sqlite3 connections must stay on the thread that opened them
+_local = threading.local()
+
+
+def _connection():
+    """This thread's connection to the cache database, created on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        LOCAL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; WAL lets readers in other threads and workers proceed during writes
+        conn = sqlite3.connect(LOCAL_CACHE_PATH, isolation_level=None, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # ts is when the entry was stored and drives expiry; last_used drives eviction
+        conn.execute("CREATE TABLE IF NOT EXISTS cache(key BLOB PRIMARY KEY, val BLOB, ts INTEGER, last_used INTEGER)")
+        if "last_used" not in {row[1] for row in conn.execute("PRAGMA table_info(cache)")}:
+            # Databases from before last_used existed
+            conn.execute("ALTER TABLE cache ADD COLUMN last_used INTEGER")
+            conn.execute("UPDATE cache SET last_used = ts")
+        conn.execute("DROP INDEX IF EXISTS cache_ts")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache(last_used)")
+        _local.conn = conn
+    return conn
+
+
+def _digest(cache_key):
+    """Fixed-size binary form of a cache key"""
+    return hashlib.blake2b(cache_key.encode("utf-8"), digest_size=16).digest()
+
+
+def get_many(cache_keys):
+    """Get unexpired entries as a {cache_key: result_json} dict, marking them recently used"""
+    if not cache_keys:
+        return {}
+    digests = {_digest(key): key for key in cache_keys}
+    now = int(time.time())
+    conn = _connection()
+    rows = []
+    keys = list(digests)
+    for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+        chunk = keys[start:start + QUERY_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        rows += conn.execute(
+            f"SELECT key, val, last_used FROM cache WHERE ts >= ? AND key IN ({placeholders})",
+            (now - LOCAL_CACHE_TTL, *chunk)
+        ).fetchall()
+    stale = [(now, key) for key, _, last_used in rows if (last_used or 0) < now - LRU_TOUCH_INTERVAL]
+    if stale:
+        conn.executemany("UPDATE cache SET last_used = ? WHERE key = ?", stale)
+    return {digests[key]: val.decode("utf-8") for key, val, _ in rows}
+
+
+def put_many(entries):
+    """Store {cache_key: result_json} entries, evicting the least recently used beyond the size limit"""
+    if not entries:
+        return
+    now = int(time.time())
+    conn = _connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache(key, val, ts, last_used) VALUES (?, ?, ?, ?)",
+            [(_digest(key), value.encode("utf-8"), now, now) for key, value in entries.items()]
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (LOCAL_CACHE_MAX_ENTRIES,)
+        )
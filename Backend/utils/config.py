@@ -1,7 +1,20 @@
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 import os
-load_dotenv()
-GEMINI_MODEL = "gemini-2.5-flash"
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in the .env file.")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    gemini_model: str
+    gemini_api_key: str
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load the .env file and read the settings once per process"""
+    load_dotenv()
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in the .env file.")
+    return Settings(gemini_model="gemini-2.5-flash", gemini_api_key=gemini_api_key)
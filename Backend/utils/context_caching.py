@@ -1,74 +1,81 @@
-import sys
-import os
-
-# Add the project root to the Python path to enable running this script directly
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
 from google import genai
 from google.genai import types
 from pathlib import Path
 import io
 import os
-import sys
 import time
 import json
-from datetime import datetime
+import orjson
+import tempfile
+from datetime import datetime, timezone
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from utils.config import GEMINI_API_KEY, GEMINI_MODEL
+from utils.config import get_settings
 from utils import prompts
+from utils.prefilter import document_text, prefilter
+import asyncio
 import concurrent.futures
+import functools
 import threading
+import hashlib
+from collections import OrderedDict
+from urllib.parse import urlparse
+try:
+    from docx import Document
+except ImportError:  # DOCX support is optional
+    Document = None
 # Import the SQLite database manager
 from utils import db_manager
+from utils import cache as local_cache
 
 # Define the structured output schema for ATS scoring
 ATS_SCHEMA = {
     "type": "object",
     "properties": {
-        "candidate_name": {"type": "string"},
-        "position_applied": {"type": "string"},
-        "company": {"type": "string"},
-        "overall_fit_score": {"type": "number", "minimum": 0, "maximum": 100},
-        "recommendation": {"type": "string", "enum": ["APPROVED", "REJECTED"]},
-        "fit_level": {"type": "string", "enum": ["HIGH_FIT", "MEDIUM_FIT", "LOW_FIT", "NO_FIT"]},
+        "candidate_name": {"type": "string", "description": "Candidate name as written in the resume"},
+        "position_applied": {"type": "string", "description": "Job title from the JD"},
+        "company": {"type": "string", "description": "Hiring company from the JD, or \"Unknown\" if absent"},
+        "overall_fit_score": {"type": "number", "minimum": 0, "maximum": 100, "description": "Strict JD fulfilment"},
+        "recommendation": {"type": "string", "enum": ["APPROVED", "REJECTED"], "description": "APPROVED only if every approval criterion holds"},
+        "fit_level": {"type": "string", "enum": ["HIGH_FIT", "MEDIUM_FIT", "LOW_FIT", "NO_FIT"], "description": "HIGH_FIT: 90%+ of JD requirements met with strong evidence; MEDIUM_FIT: 80-89%; LOW_FIT: 70-79%; NO_FIT: below 70%"},
         "key_strengths": {
             "type": "array",
+            "description": "Only strengths that directly match JD requirements, with resume evidence",
             "items": {"type": "string"}
         },
         "major_concerns": {
             "type": "array",
+            "description": "Every missing mandatory requirement or skill gap",
             "items": {"type": "string"}
         },
         "skills_assessment": {
             "type": "object",
             "properties": {
-                "required_skills_match": {"type": "integer", "minimum": 0, "maximum": 100},
-                "preferred_skills_match": {"type": "integer", "minimum": 0, "maximum": 100},
+                "required_skills_match": {"type": "integer", "minimum": 0, "maximum": 100, "description": "Percentage of required JD skills met"},
+                "preferred_skills_match": {"type": "integer", "minimum": 0, "maximum": 100, "description": "Percentage of preferred JD skills met"},
                 "critical_skills_missing": {
                     "type": "array",
+                    "description": "Every required JD skill not found in the resume",
                     "items": {"type": "string"}
                 },
-                "skill_gaps_impact": {"type": "string", "enum": ["Low", "Medium", "High", "Critical"]}
+                "skill_gaps_impact": {"type": "string", "enum": ["Low", "Medium", "High", "Critical"], "description": "How much the gaps hinder doing the job"}
             },
             "required": ["required_skills_match", "preferred_skills_match", "critical_skills_missing", "skill_gaps_impact"]
         },
         "experience_fit": {
             "type": "object",
             "properties": {
-                "years_required": {"type": "number", "minimum": 0},
-                "years_candidate_has": {"type": "number", "minimum": 0},
-                "experience_relevance": {"type": "string", "enum": ["High", "Medium", "Low", "None"]},
-                "project_quality": {"type": "string", "enum": ["Excellent", "Good", "Average", "Poor"]}
+                "years_required": {"type": "number", "minimum": 0, "description": "Minimum years of experience in the JD"},
+                "years_candidate_has": {"type": "number", "minimum": 0, "description": "Candidate's years of relevant experience"},
+                "experience_relevance": {"type": "string", "enum": ["High", "Medium", "Low", "None"], "description": "Domain relevance of the experience to the JD"},
+                "project_quality": {"type": "string", "enum": ["Excellent", "Good", "Average", "Poor"], "description": "Quality of the projects relevant to the JD"}
             },
             "required": ["years_required", "years_candidate_has", "experience_relevance", "project_quality"]
         },
         "hiring_decision_factors": {
             "type": "object",
+            "description": "Each factor scored 0-100",
             "properties": {
                 "technical_competency": {"type": "integer", "minimum": 0, "maximum": 100},
                 "experience_level": {"type": "integer", "minimum": 0, "maximum": 100},
@@ -86,6 +93,321 @@ ATS_SCHEMA = {
     ]
 }
 
+# ATS_SCHEMA converted to the SDK's Schema type once at import, so structured
+# output requests don't rebuild and validate it from the dict on every call.
+# The JSONL batch path still needs the plain dict, which must serialize as JSON.
+ATS_RESPONSE_SCHEMA = types.Schema.model_validate(ATS_SCHEMA)
+
+# Generation configs are validated once here; each request copies one with
+# its cache name filled in (model_copy skips validation)
+_STRUCTURED_CONFIG_TEMPLATE = types.GenerateContentConfig(
+    response_schema=ATS_RESPONSE_SCHEMA,
+    response_mime_type="application/json"
+)
+_TEXT_CONFIG_TEMPLATE = types.GenerateContentConfig()
+
+
+def _generation_config(cache_name, structured=True):
+    """
+    GenerateContentConfig that answers from cache_name, with the ATS schema if structured.
+
+    Without a cache_name the system prompt is sent with the request instead.
+    """
+    template = _STRUCTURED_CONFIG_TEMPLATE if structured else _TEXT_CONFIG_TEMPLATE
+    if cache_name is None:
+        return template.model_copy(update={"system_instruction": prompts.SYSTEM_PROMPT_PART})
+    return template.model_copy(update={"cached_content": cache_name})
+
+
+# User message for requests that attach the JD and resume as files, with the
+# system prompt inlined. Built once and shared by every request.
+ANALYSIS_PROMPT = f"""
+{prompts.system_prompt}
+
+Please analyze the following resume against the job description and provide a comprehensive ATS evaluation.
+
+Job Description: (see attached file)
+Resume: (see attached file)
+"""
+
+
+# MIME type each supported extension is uploaded as (DOCX is sent as extracted text)
+_EXT_TO_MIME = {".pdf": "application/pdf", ".docx": "text/plain"}
+_SUPPORTED_EXTS = frozenset(_EXT_TO_MIME)
+
+
+def _validate_file_type(path: Path) -> str:
+    """Return the lowercased extension of a supported file, raising ValueError otherwise"""
+    ext = path.suffix.lower()
+    if ext not in _SUPPORTED_EXTS:
+        raise ValueError(f"Unsupported file type: {path.suffix}. Only PDF and DOCX are supported.")
+    return ext
+
+
+def is_remote_uri(path) -> bool:
+    """Whether path is a gs:// or https:// reference Gemini can read directly"""
+    return isinstance(path, str) and path.startswith(("gs://", "https://"))
+
+
+def remote_file_part(uri, username=None, file_type=None):
+    """
+    Reference a PDF in cloud storage (gs:// or signed https:// URL) without uploading it.
+
+    Args:
+        uri (str): Location of the file
+        username (str): Username to associate with the file record
+        file_type (str): File type to store with the record
+
+    Returns:
+        tuple: (types.Part, database file id or None), like inline_file_part
+    """
+    path = Path(urlparse(uri).path)
+    # DOCX is sent as extracted text, which needs the file locally
+    if _validate_file_type(path) != ".pdf":
+        raise ValueError(f"Only PDF files can be referenced by URI: {uri}")
+    mime_type = _EXT_TO_MIME[".pdf"]
+    part = types.Part.from_uri(file_uri=uri, mime_type=mime_type)
+    file_id = None
+    if username and file_type:
+        file_id = _save_uploaded_file_record(username, path.name, file_type, mime_type, uri)
+    return part, file_id
+
+
+def _convert_docx_to_text(source) -> str:
+    """Extract the paragraph text of a DOCX given as a path or binary file object"""
+    if Document is None:
+        raise ImportError("python-docx is required to read DOCX files")
+    doc = Document(source)
+    # join() materializes its argument anyway; a list skips the generator overhead
+    return "\n".join([p.text for p in doc.paragraphs])
+
+
+@functools.lru_cache(maxsize=256)
+def _docx_text_for_file(path_str, mtime_ns):
+    """Memoized _convert_docx_to_text for a file on disk; mtime_ns invalidates edited files"""
+    return _convert_docx_to_text(path_str)
+
+
+# Fingerprint of everything besides the two documents that shapes an analysis,
+# so changing the model, prompt or schema invalidates previously cached results.
+# Reading the settings here also fails fast at import when the API key is missing
+ANALYSIS_CACHE_VERSION = hashlib.sha256(
+    "\0".join([get_settings().gemini_model, prompts.system_prompt, json.dumps(ATS_SCHEMA, sort_keys=True)]).encode("utf-8")
+).hexdigest()[:16]
+
+
+def analysis_cache_key(jd_hash, resume_hash, prompt_type="analysis"):
+    """Key under which the analysis of a (JD, resume) pair is cached, from their content hashes"""
+    return f"ana:{ANALYSIS_CACHE_VERSION}:{prompt_type}:{jd_hash}:{resume_hash}"
+
+
+# Concurrent file uploads in analyze_bulk_resumes
+BULK_UPLOAD_WORKERS = 8
+
+# Worker pools for the upload and cleanup stages of analyze_bulk_resumes_parallel;
+# its generation stage is sized by the max_workers argument
+PARALLEL_UPLOAD_WORKERS = 8
+PARALLEL_CLEANUP_WORKERS = 4
+
+
+# Lookups against the persistent analysis cache since startup
+_analysis_cache_stats = {"hits": 0, "misses": 0}
+_analysis_cache_stats_lock = threading.Lock()
+
+
+def lookup_cached_analyses(cache_keys):
+    """Fetch cached analyses as a {cache_key: result_json} dict, counting hits and misses"""
+    # The local SQLite cache answers first; only its misses go to PostgreSQL,
+    # and what PostgreSQL finds is copied locally for next time
+    try:
+        cached = local_cache.get_many(cache_keys)
+    except Exception as e:
+        print(f"Warning: Could not read the local analysis cache: {e}")
+        cached = {}
+    missing = [key for key in cache_keys if key not in cached]
+    if missing:
+        shared = db_manager.get_cached_analyses(missing)
+        if shared:
+            cached.update(shared)
+            try:
+                local_cache.put_many(shared)
+            except Exception as e:
+                print(f"Warning: Could not update the local analysis cache: {e}")
+    with _analysis_cache_stats_lock:
+        _analysis_cache_stats["hits"] += len(cached)
+        _analysis_cache_stats["misses"] += len(cache_keys) - len(cached)
+    return cached
+
+
+def store_cached_analyses(entries):
+    """Store {cache_key: result_json} analyses in the local and the PostgreSQL cache"""
+    try:
+        local_cache.put_many(entries)
+    except Exception as e:
+        print(f"Warning: Could not update the local analysis cache: {e}")
+    db_manager.save_cached_analyses(entries)
+
+
+def get_analysis_cache_stats():
+    """Return the analysis cache hit and miss counts since startup"""
+    with _analysis_cache_stats_lock:
+        return dict(_analysis_cache_stats)
+
+
+# Prepared JD payloads keyed by content hash, so a JD shared by every resume in a
+# batch (and by repeat requests for the same JD) is read and converted only once
+JD_CONTEXT_CACHE_SIZE = 32
+_jd_contexts = OrderedDict()
+_jd_contexts_lock = threading.Lock()
+
+
+def sha256_file(file_path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file, hashing it in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_or_build_jd_context(jd_hash, jd_file_path):
+    """
+    Return the prepared upload payload for a job description, building it once per content hash.
+
+    Args:
+        jd_hash (str): SHA-256 of the JD file contents
+        jd_file_path (str): Path to the job description file (.pdf or .docx)
+
+    Returns:
+        dict: {"data": bytes, "mime_type": str, "file_type": str}
+    """
+    with _jd_contexts_lock:
+        context = _jd_contexts.get(jd_hash)
+        if context is not None:
+            _jd_contexts.move_to_end(jd_hash)
+            return context
+
+    path = Path(jd_file_path)
+    ext = _validate_file_type(path)
+
+    if ext == ".docx":
+        data = _convert_docx_to_text(path).encode("utf-8")
+    else:
+        data = path.read_bytes()
+
+    context = {"data": data, "mime_type": _EXT_TO_MIME[ext], "file_type": ext[1:]}
+    with _jd_contexts_lock:
+        _jd_contexts[jd_hash] = context
+        _jd_contexts.move_to_end(jd_hash)
+        while len(_jd_contexts) > JD_CONTEXT_CACHE_SIZE:
+            _jd_contexts.popitem(last=False)
+    return context
+
+
+# Text extracted from DOCX files, kept on disk by content hash so a resume
+# analyzed against several JDs is only parsed once
+DOCX_TEXT_CACHE_DIR = Path(os.getenv("RESUME_MATCH_CACHE_DIR", str(Path.home() / ".resume_match_cache")))
+DOCX_TEXT_CACHE_TTL = 30 * 24 * 3600  # seconds
+
+
+def open_upload_payload(file_path, content_hash=None):
+    """
+    Open the content to upload for a JD or resume file, with its MIME type.
+
+    PDFs are streamed from an open file handle rather than read into memory.
+    DOCX files are converted to plain text, which is cached in
+    DOCX_TEXT_CACHE_DIR under the SHA-256 of the document, so the same
+    content is parsed once whatever its filename. The document itself is
+    only opened on a cache miss.
+
+    Args:
+        file_path (str): Path to a .pdf or .docx file
+        content_hash (str): SHA-256 of the file, if the caller already computed it
+
+    Returns:
+        tuple: (binary file object, mime_type); the caller closes the file object
+    """
+    path = Path(file_path)
+    ext = path.suffix.lower()
+    if ext != ".docx":
+        return open(path, "rb"), _EXT_TO_MIME.get(ext, "application/pdf")
+
+    if content_hash is None:
+        content_hash = sha256_file(path)
+    cache_path = DOCX_TEXT_CACHE_DIR / f"{content_hash}.txt"
+    try:
+        if time.time() - cache_path.stat().st_mtime < DOCX_TEXT_CACHE_TTL:
+            return io.BytesIO(cache_path.read_bytes()), "text/plain"
+    except OSError:
+        pass
+
+    text = _convert_docx_to_text(path).encode("utf-8")
+    try:
+        DOCX_TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a per-thread name and rename, so concurrent readers never see a partial file
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(text)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not cache DOCX text for {path.name}: {e}")
+    return io.BytesIO(text), "text/plain"
+
+
+# Names of the per-JD context caches created by the parallel analyzer, kept on
+# disk so later runs (or other workers) within the TTL reuse a live cache
+# instead of uploading and ingesting the JD again
+GEMINI_CACHE_INDEX_DIR = DOCX_TEXT_CACHE_DIR / "gemini_caches"
+JD_CONTEXT_CACHE_TTL = 1800  # seconds
+
+
+def _read_cache_index(index_key):
+    """Return the cache name recorded for index_key, or None if missing or about to expire"""
+    try:
+        entry = orjson.loads((GEMINI_CACHE_INDEX_DIR / f"{index_key}.json").read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    # Leave a margin so a cache is not picked up just before it expires
+    if entry.get("expires_at", 0) - time.time() < 60:
+        return None
+    return entry.get("name")
+
+
+def _write_cache_index(index_key, cache_name):
+    """Record cache_name for index_key as valid for JD_CONTEXT_CACHE_TTL from now"""
+    index_path = GEMINI_CACHE_INDEX_DIR / f"{index_key}.json"
+    try:
+        GEMINI_CACHE_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a per-thread name and rename, so concurrent readers never see a partial file
+        tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(orjson.dumps({"name": cache_name, "expires_at": time.time() + JD_CONTEXT_CACHE_TTL}))
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Warning: could not record context cache {cache_name}: {e}")
+
+
+async def _reuse_indexed_cache(client, index_key):
+    """Return a still-live cache name recorded for index_key with its TTL renewed, or None"""
+    cache_name = await asyncio.to_thread(_read_cache_index, index_key)
+    if cache_name is None:
+        return None
+    try:
+        # Renewing the TTL also confirms the cache still exists
+        await client.aio.caches.update(
+            name=cache_name,
+            config=types.UpdateCachedContentConfig(ttl=f"{JD_CONTEXT_CACHE_TTL}s")
+        )
+    except Exception as e:
+        print(f"Recorded context cache {cache_name} is no longer usable: {e}")
+        return None
+    await asyncio.to_thread(_write_cache_index, index_key, cache_name)
+    return cache_name
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Return the process-wide Gemini client, so its HTTP connection pool is reused across calls"""
+    return genai.Client(api_key=get_settings().gemini_api_key)
+
 
 @retry(
     stop=stop_after_attempt(3),
@@ -95,22 +417,36 @@ ATS_SCHEMA = {
 def upload_file_with_retry(client, file_io, mime_type, username=None, filename=None, file_type=None):
     """Upload file with retry logic for connection issues and store info in database"""
     try:
+        # A failed attempt may have consumed part of the stream; retries start over
+        file_io.seek(0)
         uploaded = client.files.upload(file=file_io, config=dict(mime_type=mime_type))
         file_id = None
         # Store file information in the database if username is provided
         if username and filename and file_type:
-            # Get or create user (now returns user_id as string)
-            user = db_manager.get_or_create_user(username)
-
-            # Save file record
-            file_path = str(Path(filename).absolute()) if isinstance(filename, (str, Path)) else "memory_file"
-            file_id = db_manager.save_file_record(
-                user_id=user['id'],  # user['id'] is now the username string
-                filename=filename,
-                file_path=file_path,
-                file_type=file_type,
-                mime_type=mime_type,
-                gemini_file_id=uploaded.name
+            file_id = _save_uploaded_file_record(username, filename, file_type, mime_type, uploaded.name)
+
+        return uploaded, file_id
+    except Exception as e:
+        print(f"Upload attempt failed: {e}")
+        raise
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type((httpx.ConnectError, ConnectionError, TimeoutError))
+)
+async def upload_file_with_retry_async(client, file_io, mime_type, username=None, filename=None, file_type=None):
+    """Async version of upload_file_with_retry using the client's aio interface; the database write runs in a thread"""
+    try:
+        # A failed attempt may have consumed part of the stream; retries start over
+        file_io.seek(0)
+        uploaded = await client.aio.files.upload(file=file_io, config=dict(mime_type=mime_type))
+        file_id = None
+        # Store file information in the database if username is provided
+        if username and filename and file_type:
+            file_id = await asyncio.to_thread(
+                _save_uploaded_file_record, username, filename, file_type, mime_type, uploaded.name
             )
 
         return uploaded, file_id
@@ -118,6 +454,92 @@ def upload_file_with_retry(client, file_io, mime_type, username=None, filename=N
         print(f"Upload attempt failed: {e}")
         raise
 
+
+def _save_uploaded_file_record(username, filename, file_type, mime_type, gemini_file_id):
+    """Record an uploaded file in the user's data and return its database id"""
+    # Get or create user (now returns user_id as string)
+    user = db_manager.get_or_create_user(username)
+
+    # Save file record
+    file_path = str(Path(filename).absolute()) if isinstance(filename, (str, Path)) else "memory_file"
+    return db_manager.save_file_record(
+        user_id=user['id'],  # user['id'] is now the username string
+        filename=filename,
+        file_path=file_path,
+        file_type=file_type,
+        mime_type=mime_type,
+        gemini_file_id=gemini_file_id
+    )
+
+
+# Files smaller than this are sent inline with the request instead of through
+# the Files API, skipping the upload, the PROCESSING poll and the cleanup call;
+# well under the inline request limit once base64-encoded
+INLINE_UPLOAD_MAX_BYTES = int(os.getenv("INLINE_UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+
+def _payload_size(file_io):
+    """Size in bytes of a seekable file object, leaving it rewound"""
+    size = file_io.seek(0, io.SEEK_END)
+    file_io.seek(0)
+    return size
+
+def inline_file_part(file_io, mime_type, username=None, filename=None, file_type=None):
+    """Build an inline Part in place of an upload and store file info in database, returning (part, file_id)"""
+    file_io.seek(0)
+    part = types.Part.from_bytes(data=file_io.read(), mime_type=mime_type)
+    file_id = None
+    # Store file information in the database if username is provided
+    if username and filename and file_type:
+        file_id = _save_uploaded_file_record(username, filename, file_type, mime_type, None)
+    return part, file_id
+
+def _utc_timestamp():
+    """Current UTC time in ISO 8601 with a Z suffix, for evaluation timestamps"""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _wait_ready(client, uploaded, initial=0.2, factor=1.7, cap=2.0):
+    """Poll an uploaded file until Gemini finishes processing it, backing off from initial by factor up to cap seconds"""
+    delay = initial
+    while hasattr(uploaded, "state") and uploaded.state.name == "PROCESSING":
+        time.sleep(delay)
+        delay = min(delay * factor, cap)
+        uploaded = client.files.get(name=uploaded.name)
+    return uploaded
+
+async def _wait_ready_async(client, uploaded, initial=0.2, factor=1.7, cap=2.0):
+    """Async version of _wait_ready, polling through the client's aio interface"""
+    delay = initial
+    while hasattr(uploaded, "state") and uploaded.state.name == "PROCESSING":
+        await asyncio.sleep(delay)
+        delay = min(delay * factor, cap)
+        uploaded = await client.aio.files.get(name=uploaded.name)
+    return uploaded
+
+def _delete_uploaded_files(client, names):
+    """Delete uploaded Gemini files concurrently, printing one warning for any that fail"""
+    def _delete(name):
+        try:
+            client.files.delete(name=name)
+        except Exception as e:
+            return name, e
+        return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BULK_UPLOAD_WORKERS) as executor:
+        failures = [failure for failure in executor.map(_delete, names) if failure]
+    if failures:
+        print(f"Warning: Could not clean up {len(failures)} of {len(names)} files: "
+              + "; ".join(f"{name}: {e}" for name, e in failures))
+
+async def _delete_uploaded_files_async(client, names, cache_names=()):
+    """Async version of _delete_uploaded_files, also deleting the given context caches"""
+    targets = [(name, client.aio.caches.delete(name=name)) for name in cache_names]
+    targets += [(name, client.aio.files.delete(name=name)) for name in names]
+    outcomes = await asyncio.gather(*(coro for _, coro in targets), return_exceptions=True)
+    failures = [(name, e) for (name, _), e in zip(targets, outcomes) if isinstance(e, Exception)]
+    if failures:
+        print(f"Warning: Could not clean up {len(failures)} of {len(targets)} files: "
+              + "; ".join(f"{name}: {e}" for name, e in failures))
+
 def analyze_two_files(file1_path, file2_path, username=None, user_query="", prompt_type="analysis", use_structured_output=True):
     """
     Analyze two files (PDF or DOCX) with Gemini in one simple function.
@@ -133,86 +555,101 @@ def analyze_two_files(file1_path, file2_path, username=None, user_query="", prom
     Returns:
         str: The AI-generated analysis result (JSON string if structured output is used)
     """
-    # Helpers inside the function
-    def _validate_file_type(path: Path):
-        if path.suffix.lower() not in {".pdf", ".docx"}:
-            raise ValueError(f"Unsupported file type: {path.suffix}. Only PDF and DOCX are supported.")
-
-    def _get_mime_type(path: Path) -> str:
-        return "application/pdf" if path.suffix.lower() == ".pdf" else "text/plain"
-
-    def _convert_docx_to_text(path: Path) -> str:
-        from docx import Document
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-
-    # Initialize Gemini client
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
     # Get or create user if username is provided
     user_id = None
     if username:
         user = db_manager.get_or_create_user(username)
         user_id = user['id']
 
-    # Prepare both files
-    uploaded_files = []
-    db_file_ids = []
-    
-    for idx, f in enumerate([file1_path, file2_path]):
+    # Return a previous result for the same documents and request without
+    # calling Gemini. The default structured request shares its cache entries
+    # with the upload routes; anything else is keyed by mode and query too.
+    for f in (file1_path, file2_path):
+        _validate_file_type(Path(f))
+    if use_structured_output and not user_query.strip():
+        variant = prompt_type
+    else:
+        query_hash = hashlib.sha256(user_query.encode("utf-8")).hexdigest()[:16]
+        variant = f"{prompt_type}:{'json' if use_structured_output else 'text'}:{query_hash}"
+    file_hashes = {f: sha256_file(f) for f in (file1_path, file2_path)}
+    cache_key = analysis_cache_key(file_hashes[file1_path], file_hashes[file2_path], variant)
+    cached = lookup_cached_analyses([cache_key]).get(cache_key)
+    if cached is not None:
+        if user_id:
+            db_manager.save_analysis_result(user_id, None, None, None, _storable_result(cached))
+        return cached
+
+    # Shared Gemini client
+    client = _get_client()
+
+    # Prepare and upload one file, returning None if a DOCX upload fails
+    def _upload_one(f):
         path = Path(f)
-        _validate_file_type(path)
-        file_type = path.suffix.lower()[1:]  # Remove the dot
+        ext = _validate_file_type(path)
+        file_type = ext[1:]  # Remove the dot
         
-        if path.suffix.lower() == ".docx":
-            text_content = _convert_docx_to_text(path)
-            file_io = io.BytesIO(text_content.encode("utf-8"))
-            mime_type = "text/plain"
-        else:
-            file_io = io.BytesIO(path.read_bytes())
-            mime_type = _get_mime_type(path)
+        file_io, mime_type = open_upload_payload(path, file_hashes[f])
+
+        # Small files go inline with the cached content, no upload needed
+        if _payload_size(file_io) < INLINE_UPLOAD_MAX_BYTES:
+            with file_io:
+                return inline_file_part(
+                    file_io,
+                    mime_type,
+                    username=username,
+                    filename=path.name,
+                    file_type=file_type
+                )
         
         try:
-            uploaded, db_file_id = upload_file_with_retry(
-                client, 
-                file_io, 
-                mime_type,
-                username=username,
-                filename=path.name,
-                file_type=file_type
-            )
+            with file_io:
+                uploaded, db_file_id = upload_file_with_retry(
+                    client, 
+                    file_io, 
+                    mime_type,
+                    username=username,
+                    filename=path.name,
+                    file_type=file_type
+                )
         except Exception as e:
             print(f"Failed to upload {f} after retries: {e}")
             # Fallback: try to continue with text content if possible
-            if path.suffix.lower() == ".pdf":
+            if ext == ".pdf":
                 print("PDF upload failed. Please check your network connection.")
                 raise
             else:
                 print("Proceeding with text content...")
-                continue
+                return None
                 
         # Wait if processing
-        while hasattr(uploaded, "state") and uploaded.state.name == "PROCESSING":
-            time.sleep(2)
-            uploaded = client.files.get(name=uploaded.name)
-            
+        uploaded = _wait_ready(client, uploaded)
+        
+        return uploaded, db_file_id
+
+    # Upload both files concurrently; map keeps them in JD, resume order
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        uploads = list(executor.map(_upload_one, [file1_path, file2_path]))
+
+    uploaded_files = []
+    db_file_ids = []
+    for upload in uploads:
+        if upload is None:
+            continue
+        uploaded, db_file_id = upload
         uploaded_files.append(uploaded)
         
         # Store the database file ID if available
-        if db_file_id:
-            db_file_ids.append(db_file_id)
-        else:
-            db_file_ids.append(None)
+        db_file_ids.append(db_file_id or None)
 
     # Create cache
     display_name = f"Cache with {Path(file1_path).name} and {Path(file2_path).name}"
     cache = client.caches.create(
-        model=GEMINI_MODEL,
+        model=get_settings().gemini_model,
         config=types.CreateCachedContentConfig(
             display_name=display_name,
             system_instruction={
-                "analysis": prompts.system_prompt,
-            }.get(prompt_type, prompts.system_prompt),
+                "analysis": prompts.SYSTEM_PROMPT_PART,
+            }.get(prompt_type, prompts.SYSTEM_PROMPT_PART),
             contents=uploaded_files,
             ttl="1800s",
         ),
@@ -237,24 +674,20 @@ def analyze_two_files(file1_path, file2_path, username=None, user_query="", prom
         query_content = user_query if user_query.strip() else "Analyze the resume against the job description."
         
         response = client.models.generate_content(
-            model=GEMINI_MODEL,
+            model=get_settings().gemini_model,
             contents=query_content,
-            config=types.GenerateContentConfig(
-                cached_content=cache.name,
-                response_schema=ATS_SCHEMA,
-                response_mime_type="application/json"
-            ),
+            config=_generation_config(cache.name),
         )
         
         # Parse the JSON response and add timestamps
         try:
-            result_data = json.loads(response.text)
+            result_data = orjson.loads(response.text)
             
             # Add automatic timestamp for when evaluation was performed
-            current_time = datetime.now().isoformat() + "Z"
+            current_time = _utc_timestamp()
             result_data["evaluation_timestamp"] = current_time
             
-            result_json = json.dumps(result_data, indent=2)
+            result_json = orjson.dumps(result_data, option=orjson.OPT_INDENT_2).decode()
             
             # Store the analysis result in the database if username is provided
             if username and cache_id and len(db_file_ids) == 2 and all(db_file_ids):
@@ -264,20 +697,21 @@ def analyze_two_files(file1_path, file2_path, username=None, user_query="", prom
                     cache_id=cache_id,
                     jd_file_id=jd_file_id,
                     resume_file_id=resume_file_id,
-                    result_json=result_json
+                    result=result_data
                 )
             
+            store_cached_analyses({cache_key: result_json})
             return result_json
             
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # If JSON parsing fails, return original response
             return response.text
             
     else:
         response = client.models.generate_content(
-            model=GEMINI_MODEL,
+            model=get_settings().gemini_model,
             contents=user_query,
-            config=types.GenerateContentConfig(cached_content=cache.name),
+            config=_generation_config(cache.name, structured=False),
         )
         result_text = response.text
         
@@ -289,9 +723,11 @@ def analyze_two_files(file1_path, file2_path, username=None, user_query="", prom
                 cache_id=cache_id,
                 jd_file_id=jd_file_id,
                 resume_file_id=resume_file_id,
-                result_json=json.dumps({"text_result": result_text})
+                result={"text_result": result_text}
             )
         
+        if result_text:
+            store_cached_analyses({cache_key: result_text})
         return result_text
 
 
@@ -309,21 +745,8 @@ def analyze_bulk_resumes(jd_file_path, resume_file_paths, username=None, use_str
     Returns:
         dict: Dictionary with resume paths as keys and analysis results as values
     """
-    # Helper functions (same as in analyze_two_files)
-    def _validate_file_type(path: Path):
-        if path.suffix.lower() not in {".pdf", ".docx"}:
-            raise ValueError(f"Unsupported file type: {path.suffix}. Only PDF and DOCX are supported.")
-
-    def _get_mime_type(path: Path) -> str:
-        return "application/pdf" if path.suffix.lower() == ".pdf" else "text/plain"
-
-    def _convert_docx_to_text(path: Path) -> str:
-        from docx import Document
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-
-    # Initialize Gemini client
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    # Shared Gemini client
+    client = _get_client()
     
     # Get or create user if username is provided
     user_id = None
@@ -331,94 +754,116 @@ def analyze_bulk_resumes(jd_file_path, resume_file_paths, username=None, use_str
         user = db_manager.get_or_create_user(username)
         user_id = user['id']
     
-    # Upload JD file first (this will be reused for all requests)
-    print("Uploading job description...")
-    jd_path = Path(jd_file_path)
-    _validate_file_type(jd_path)
-    file_type = jd_path.suffix.lower()[1:]  # Remove the dot
-    
-    if jd_path.suffix.lower() == ".docx":
-        jd_text_content = _convert_docx_to_text(jd_path)
-        jd_file_io = io.BytesIO(jd_text_content.encode("utf-8"))
-        jd_mime_type = "text/plain"
-    else:
-        jd_file_io = io.BytesIO(jd_path.read_bytes())
-        jd_mime_type = _get_mime_type(jd_path)
-    
-    jd_uploaded, jd_db_file_id = upload_file_with_retry(
-        client, 
-        jd_file_io, 
-        jd_mime_type,
-        username=username,
-        filename=jd_path.name,
-        file_type=file_type
-    )
-    
-    # Wait if processing
-    while hasattr(jd_uploaded, "state") and jd_uploaded.state.name == "PROCESSING":
-        time.sleep(2)
-        jd_uploaded = client.files.get(name=jd_uploaded.name)
-    
-    print(f"Job description uploaded: {jd_uploaded.name}")
-    
-    # Upload all resume files
-    print(f"Uploading {len(resume_file_paths)} resumes...")
-    uploaded_resumes = {}
-    
-    for resume_path in resume_file_paths:
-        path = Path(resume_path)
-        _validate_file_type(path)
-        file_type = path.suffix.lower()[1:]  # Remove the dot
+    # Prepare, upload and wait for one file; returns (uploaded, db_file_id).
+    # With record=False the file is not saved to the database (db_file_id is None)
+    def _upload_one(file_path, content_hash=None, record=True):
+        path = Path(file_path)
+        ext = _validate_file_type(path)
+        file_type = ext[1:]  # Remove the dot
         
-        if path.suffix.lower() == ".docx":
-            text_content = _convert_docx_to_text(path)
-            file_io = io.BytesIO(text_content.encode("utf-8"))
-            mime_type = "text/plain"
-        else:
-            file_io = io.BytesIO(path.read_bytes())
-            mime_type = _get_mime_type(path)
+        file_io, mime_type = open_upload_payload(path, content_hash)
         
-        try:
-            uploaded, resume_db_file_id = upload_file_with_retry(
+        with file_io:
+            uploaded, db_file_id = upload_file_with_retry(
                 client, 
                 file_io, 
                 mime_type,
-                username=username,
+                username=username if record else None,
                 filename=path.name,
                 file_type=file_type
             )
-            
-            # Wait if processing
-            while hasattr(uploaded, "state") and uploaded.state.name == "PROCESSING":
-                time.sleep(2)
-                uploaded = client.files.get(name=uploaded.name)
-            
-            uploaded_resumes[resume_path] = (uploaded, resume_db_file_id)
-            print(f"Uploaded: {path.name}")
-            
+        
+        # Wait if processing
+        uploaded = _wait_ready(client, uploaded)
+        
+        return uploaded, db_file_id
+
+    def _upload_resume(resume_path):
+        try:
+            # Resume records are saved together once all uploads are done
+            uploaded = _upload_one(resume_path, resume_hashes.get(resume_path), record=False)
+            print(f"Uploaded: {Path(resume_path).name}")
+            return resume_path, uploaded
         except Exception as e:
             print(f"Failed to upload {resume_path}: {e}")
-            continue
+            return resume_path, None
+    
+    # Upload and analyze each distinct resume once; other paths with the same
+    # contents share its result. Unreadable files are kept so their upload
+    # fails and is reported as before.
+    paths_by_hash = {}
+    duplicate_resumes = {}
+    # Hashes of readable resumes, reused to look up their DOCX text
+    resume_hashes = {}
+    for resume_path in resume_file_paths:
+        try:
+            content_hash = resume_hashes[resume_path] = sha256_file(resume_path)
+        except OSError:
+            content_hash = resume_path
+        if content_hash in paths_by_hash:
+            duplicate_resumes[resume_path] = paths_by_hash[content_hash]
+        else:
+            paths_by_hash[content_hash] = resume_path
+    unique_resume_paths = list(paths_by_hash.values())
+
+    def _with_duplicates(results):
+        for duplicate_path, original_path in duplicate_resumes.items():
+            if original_path in results:
+                results[duplicate_path] = results[original_path]
+        return results
+    
+    # Upload the JD and all resumes concurrently; uploads are network-bound, so
+    # this scales with the pool size up to the API's rate limits
+    print(f"Uploading job description and {len(unique_resume_paths)} resumes...")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BULK_UPLOAD_WORKERS) as executor:
+        # The JD is reused for all requests, so a failed JD upload is fatal
+        jd_future = executor.submit(_upload_one, jd_file_path)
+        resume_uploads = list(executor.map(_upload_resume, unique_resume_paths))
+        jd_uploaded, jd_db_file_id = jd_future.result()
+    
+    print(f"Job description uploaded: {jd_uploaded.name}")
     
-    # Create batch requests
+    # Keep the successful uploads, in input order
+    uploaded_resumes = {
+        resume_path: uploaded for resume_path, uploaded in resume_uploads if uploaded is not None
+    }
+
+    # Record the uploaded resumes in one statement
+    if user_id and uploaded_resumes:
+        try:
+            resume_db_file_ids = db_manager.save_file_records(user_id, [
+                {
+                    'filename': Path(resume_path).name,
+                    'file_path': str(Path(resume_path).absolute()),
+                    'file_type': Path(resume_path).suffix.lower()[1:],
+                    'mime_type': uploaded.mime_type,
+                    'gemini_file_id': uploaded.name
+                }
+                for resume_path, (uploaded, _) in uploaded_resumes.items()
+            ])
+            uploaded_resumes = {
+                resume_path: (uploaded, db_file_id)
+                for (resume_path, (uploaded, _)), db_file_id in zip(uploaded_resumes.items(), resume_db_file_ids)
+            }
+        except Exception as e:
+            print(f"Warning: Could not record uploaded resumes: {e}")
+    
+    # Create batch requests. Inline requests are collected in a list; file
+    # requests are streamed straight into the JSONL file as they are built
     print("Creating batch requests...")
+    num_requests = len(uploaded_resumes)
     batch_requests = []
+    if batch_method != "inline":
+        batch_file = tempfile.NamedTemporaryFile(mode='wb', suffix='.jsonl', delete=False)
+        batch_file_path = batch_file.name
     
     for i, (resume_path, (resume_uploaded, resume_db_file_id)) in enumerate(uploaded_resumes.items()):
-        # Create the request content with system instruction included in the user message
-        analysis_prompt = f"""
-{prompts.system_prompt}
-
-Please analyze the following resume against the job description and provide a comprehensive ATS evaluation.
-
-Job Description: (see attached file)
-Resume: (see attached file)
-"""
-        
+        # Create the request content with system instruction included in the user message;
+        # every request shares the one ANALYSIS_PROMPT string
         request_config = {
             'contents': [{
                 'parts': [
-                    {'text': analysis_prompt},
+                    {'text': ANALYSIS_PROMPT},
                     {'file_data': {'file_uri': jd_uploaded.name, 'mime_type': jd_uploaded.mime_type}},
                     {'file_data': {'file_uri': resume_uploaded.name, 'mime_type': resume_uploaded.mime_type}}
                 ],
@@ -429,59 +874,56 @@ Resume: (see attached file)
         if use_structured_output:
             request_config['config'] = {
                 'response_mime_type': 'application/json',
-                'response_schema': ATS_SCHEMA
+                'response_schema': ATS_RESPONSE_SCHEMA if batch_method == "inline" else ATS_SCHEMA
             }
         
         if batch_method == "inline":
             batch_requests.append(request_config)
         else:  # file method
-            batch_requests.append({
+            batch_file.write(orjson.dumps({
                 'key': f'resume-{i}',
                 'request': request_config
-            })
+            }) + b'\n')
+    
+    if batch_method != "inline":
+        batch_file.close()
     
     # Create batch job
-    print(f"Creating batch job with {len(batch_requests)} requests...")
+    print(f"Creating batch job with {num_requests} requests...")
     batch_job_id = None
     
     try:
         if batch_method == "inline":
             # Inline method for smaller batches
             batch_job = client.batches.create(
-                model=GEMINI_MODEL,
+                model=get_settings().gemini_model,
                 src=batch_requests,
                 config={
-                    'display_name': f"Bulk Resume Analysis - {len(batch_requests)} resumes",
+                    'display_name': f"Bulk Resume Analysis - {num_requests} resumes",
                 }
             )
         else:
             # File method for larger batches
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
-                for req in batch_requests:
-                    f.write(json.dumps(req) + '\n')
-                batch_file_path = f.name
-            
-            # Upload batch file
-            uploaded_batch_file = client.files.upload(
-                file=batch_file_path,
-                config=types.UploadFileConfig(
-                    display_name='bulk-resume-batch-requests',
-                    mime_type='application/jsonl'
+            try:
+                # Upload batch file
+                uploaded_batch_file = client.files.upload(
+                    file=batch_file_path,
+                    config=types.UploadFileConfig(
+                        display_name='bulk-resume-batch-requests',
+                        mime_type='application/jsonl'
+                    )
                 )
-            )
+            finally:
+                # Clean up temp file
+                os.unlink(batch_file_path)
             
             batch_job = client.batches.create(
-                model=GEMINI_MODEL,
+                model=get_settings().gemini_model,
                 src=uploaded_batch_file.name,
                 config={
-                    'display_name': f"Bulk Resume Analysis - {len(batch_requests)} resumes",
+                    'display_name': f"Bulk Resume Analysis - {num_requests} resumes",
                 }
             )
-            
-            # Clean up temp file
-            import os
-            os.unlink(batch_file_path)
         
         print(f"Batch job created: {batch_job.name}")
         
@@ -491,14 +933,14 @@ Resume: (see attached file)
                 user_id=user_id,
                 job_name=batch_job.name,
                 job_state=batch_job.state.name,
-                num_requests=len(batch_requests)
+                num_requests=num_requests
             )
     except Exception as e:
         print(f"Error creating batch job: {e}")
         # Print more detailed error information if available
         if hasattr(e, 'details'):
             print(f"Error details: {e.details}")
-        return {resume_path: f"Batch processing error: {str(e)}" for resume_path in uploaded_resumes.keys()}
+        return _with_duplicates({resume_path: f"Batch processing error: {str(e)}" for resume_path in uploaded_resumes.keys()})
     
     # Monitor job status
     print("Monitoring batch job status...")
@@ -510,184 +952,146 @@ Resume: (see attached file)
     }
     
     try:
+        # Poll quickly at first so short jobs are picked up promptly, backing
+        # off to once a minute for long ones. The state stored at creation is
+        # only rewritten when it changes.
+        delay = 2.0
+        last_state = batch_job.state.name
         while batch_job.state.name not in completed_states:
             print(f"Current state: {batch_job.state.name}")
             
             # Update job status in database if available
-            if batch_job_id and username:
+            if batch_job_id and username and batch_job.state.name != last_state:
                 db_manager.update_batch_job_status(username, batch_job_id, batch_job.state.name)
+            last_state = batch_job.state.name
                 
-            time.sleep(30)  # Wait 30 seconds before polling again
+            time.sleep(delay)
+            delay = min(delay * 1.5, 60)
             batch_job = client.batches.get(name=batch_job.name)
         
         print(f"Batch job finished with state: {batch_job.state.name}")
         
         # Update final job status in database
         if batch_job_id and username:
-            db_manager.update_batch_job_status(
-                username,
-                batch_job_id, 
-                batch_job.state.name,
-                datetime.now().isoformat()
-            )
+            # completed_at is stamped by the database for terminal states
+            db_manager.update_batch_job_status(username, batch_job_id, batch_job.state.name)
     except Exception as e:
         print(f"Error monitoring batch job: {e}")
         
         # Update job status to error in database
         if batch_job_id and username:
-            db_manager.update_batch_job_status(
-                username,
-                batch_job_id, 
-                'JOB_STATE_ERROR',
-                datetime.now().isoformat()
-            )
+            db_manager.update_batch_job_status(username, batch_job_id, 'JOB_STATE_ERROR')
             
-        return {resume_path: f"Batch job monitoring error: {str(e)}" for resume_path in uploaded_resumes.keys()}
+        return _with_duplicates({resume_path: f"Batch job monitoring error: {str(e)}" for resume_path in uploaded_resumes.keys()})
     
-    # Retrieve results
+    # Retrieve results; requests were built in uploaded_resumes order, so
+    # response i belongs to resume_paths[i]
     results = {}
+    resume_paths = list(uploaded_resumes)
+    # Every result in the batch is stamped with the same evaluation time
+    current_time = _utc_timestamp()
     
     if batch_job.state.name == 'JOB_STATE_SUCCEEDED':
         try:
+            # Cache and analysis records are collected here and written in
+            # one transaction after the loop, instead of two writes per resume
+            pending_records = []
             if batch_method == "inline":
                 # Inline results
                 for i, inline_response in enumerate(batch_job.dest.inlined_responses):
-                    resume_path = list(uploaded_resumes.keys())[i]
+                    resume_path = resume_paths[i]
                     resume_uploaded, resume_db_file_id = uploaded_resumes[resume_path]
-                    
+                
                     if inline_response.response:
                         response_text = inline_response.response.text
-                        
+                    
                         if use_structured_output:
                             try:
-                                result_data = json.loads(response_text)
-                                # Add automatic timestamp
-                                current_time = datetime.now().isoformat() + "Z"
+                                result_data = orjson.loads(response_text)
                                 result_data["evaluation_timestamp"] = current_time
-                                result_json = json.dumps(result_data, indent=2)
+                                result_json = orjson.dumps(result_data, option=orjson.OPT_INDENT_2).decode()
                                 results[resume_path] = result_json
-                                
+                            
                                 # Store analysis result in database if username is provided
                                 if username and user_id and jd_db_file_id and resume_db_file_id:
-                                    # Create a cache record for this analysis
-                                    cache_id = db_manager.save_cache_record(
-                                        user_id=user_id,
-                                        cache_name=f"batch_analysis_{i}",
-                                        display_name=f"Batch Analysis of {Path(resume_path).name}",
-                                        jd_file_id=jd_db_file_id,
-                                        resume_file_id=resume_db_file_id,
-                                        ttl=1800
-                                    )
-                                    
-                                    # Save the analysis result
-                                    db_manager.save_analysis_result(
-                                        user_id=user_id,
-                                        cache_id=cache_id,
-                                        jd_file_id=jd_db_file_id,
-                                        resume_file_id=resume_db_file_id,
-                                        result_json=result_json
-                                    )
-                            except json.JSONDecodeError:
+                                    # Queue the cache and analysis records for one bulk write
+                                    pending_records.append((i, resume_path, resume_db_file_id, result_data))
+                            except orjson.JSONDecodeError:
                                 results[resume_path] = response_text
                         else:
                             results[resume_path] = response_text
-                            
+                        
                             # Store non-structured analysis in database
                             if username and user_id and jd_db_file_id and resume_db_file_id:
-                                # Create a cache record for this analysis
-                                cache_id = db_manager.save_cache_record(
-                                    user_id=user_id,
-                                    cache_name=f"batch_analysis_{i}",
-                                    display_name=f"Batch Analysis of {Path(resume_path).name}",
-                                    jd_file_id=jd_db_file_id,
-                                    resume_file_id=resume_db_file_id,
-                                    ttl=1800
-                                )
-                                
-                                # Save the analysis result
-                                db_manager.save_analysis_result(
-                                    user_id=user_id,
-                                    cache_id=cache_id,
-                                    jd_file_id=jd_db_file_id,
-                                    resume_file_id=resume_db_file_id,
-                                    result_json=json.dumps({"text_result": response_text})
-                                )
-                            
+                                # Queue the cache and analysis records for one bulk write
+                                pending_records.append((i, resume_path, resume_db_file_id, {"text_result": response_text}))
+                        
                     elif inline_response.error:
                         results[resume_path] = f"Error: {inline_response.error}"
             else:
                 # File results
                 result_file_name = batch_job.dest.file_name
                 file_content = client.files.download(file=result_file_name)
-                
-                lines = file_content.decode('utf-8').strip().split('\n')
-                for line in lines:
-                    line_data = json.loads(line)
+            
+                # Parse the JSONL bytes line by line without decoding or
+                # splitting the whole download first
+                for line in io.BytesIO(file_content):
+                    if not line.strip():
+                        continue
+                    line_data = orjson.loads(line)
                     if 'key' in line_data:
                         # Extract resume index from key
-                        resume_index = int(line_data['key'].split('-')[1])
-                        resume_path = list(uploaded_resumes.keys())[resume_index]
+                        resume_index = int(line_data['key'].rsplit('-', 1)[1])
+                        resume_path = resume_paths[resume_index]
                         resume_uploaded, resume_db_file_id = uploaded_resumes[resume_path]
-                        
+                    
                         if 'response' in line_data:
                             response_text = line_data['response']['candidates'][0]['content']['parts'][0]['text']
-                            
+                        
                             if use_structured_output:
                                 try:
-                                    result_data = json.loads(response_text)
-                                    # Add automatic timestamp
-                                    current_time = datetime.now().isoformat() + "Z"
+                                    result_data = orjson.loads(response_text)
                                     result_data["evaluation_timestamp"] = current_time
-                                    result_json = json.dumps(result_data, indent=2)
+                                    result_json = orjson.dumps(result_data, option=orjson.OPT_INDENT_2).decode()
                                     results[resume_path] = result_json
-                                    
+                                
                                     # Store analysis result in database if username is provided
                                     if username and user_id and jd_db_file_id and resume_db_file_id:
-                                        # Create a cache record for this analysis
-                                        cache_id = db_manager.save_cache_record(
-                                            user_id=user_id,
-                                            cache_name=f"batch_analysis_{resume_index}",
-                                            display_name=f"Batch Analysis of {Path(resume_path).name}",
-                                            jd_file_id=jd_db_file_id,
-                                            resume_file_id=resume_db_file_id,
-                                            ttl=1800
-                                        )
-                                        
-                                        # Save the analysis result
-                                        db_manager.save_analysis_result(
-                                            user_id=user_id,
-                                            cache_id=cache_id,
-                                            jd_file_id=jd_db_file_id,
-                                            resume_file_id=resume_db_file_id,
-                                            result_json=result_json
-                                        )
-                                except json.JSONDecodeError:
+                                        # Queue the cache and analysis records for one bulk write
+                                        pending_records.append((resume_index, resume_path, resume_db_file_id, result_data))
+                                except orjson.JSONDecodeError:
                                     results[resume_path] = response_text
                             else:
                                 results[resume_path] = response_text
-                                
+                            
                                 # Store non-structured analysis in database
                                 if username and user_id and jd_db_file_id and resume_db_file_id:
-                                    # Create a cache record for this analysis
-                                    cache_id = db_manager.save_cache_record(
-                                        user_id=user_id,
-                                        cache_name=f"batch_analysis_{resume_index}",
-                                        display_name=f"Batch Analysis of {Path(resume_path).name}",
-                                        jd_file_id=jd_db_file_id,
-                                        resume_file_id=resume_db_file_id,
-                                        ttl=1800
-                                    )
-                                    
-                                    # Save the analysis result
-                                    db_manager.save_analysis_result(
-                                        user_id=user_id,
-                                        cache_id=cache_id,
-                                        jd_file_id=jd_db_file_id,
-                                        resume_file_id=resume_db_file_id,
-                                        result_json=json.dumps({"text_result": response_text})
-                                    )
+                                    # Queue the cache and analysis records for one bulk write
+                                    pending_records.append((resume_index, resume_path, resume_db_file_id, {"text_result": response_text}))
                         elif 'error' in line_data:
                             results[resume_path] = f"Error: {line_data['error']}"
+
+            if pending_records:
+                with db_manager.transaction() as conn:
+                    cache_ids = db_manager.save_cache_records_bulk(user_id, [
+                        {
+                            'cache_name': f"batch_analysis_{index}",
+                            'display_name': f"Batch Analysis of {Path(resume_path).name}",
+                            'jd_file_id': jd_db_file_id,
+                            'resume_file_id': resume_db_file_id,
+                            'ttl': 1800
+                        }
+                        for index, resume_path, resume_db_file_id, _ in pending_records
+                    ], conn=conn)
+                    db_manager.save_analysis_results_bulk(user_id, [
+                        {
+                            'cache_id': cache_id,
+                            'jd_file_id': jd_db_file_id,
+                            'resume_file_id': resume_db_file_id,
+                            'result': result
+                        }
+                        for cache_id, (_, _, resume_db_file_id, result) in zip(cache_ids, pending_records)
+                    ], conn=conn)
         except Exception as e:
             print(f"Error retrieving results: {e}")
             # For any resume paths not already in results
@@ -708,84 +1112,135 @@ Resume: (see attached file)
     
     # Clean up uploaded files
     print("Cleaning up uploaded files...")
-    try:
-        client.files.delete(name=jd_uploaded.name)
-        for uploaded, _ in uploaded_resumes.values():
-            client.files.delete(name=uploaded.name)
-    except Exception as e:
-        print(f"Warning: Could not clean up some files: {e}")
+    _delete_uploaded_files(
+        client,
+        [jd_uploaded.name] + [uploaded.name for uploaded, _ in uploaded_resumes.values()]
+    )
     
-    return results
+    return _with_duplicates(results)
 
 
-def analyze_bulk_resumes_parallel(jd_file_path, resume_file_paths, username=None, use_structured_output=True, max_workers=5):
+def _resume_hashes(resume_paths, known_hashes, resume_contents):
+    """SHA-256 of each resume, reusing known hashes and in-memory contents before reading files"""
+    hashes = {}
+    for path in resume_paths:
+        if path in known_hashes:
+            hashes[path] = known_hashes[path]
+        elif path in resume_contents:
+            hashes[path] = hashlib.sha256(resume_contents[path]).hexdigest()
+        else:
+            hashes[path] = sha256_file(path)
+    return hashes
+
+
+def _is_analysis_json(result):
+    """Whether an analyzer result is a parsed analysis rather than an error or free text"""
+    try:
+        return isinstance(orjson.loads(result), dict)
+    except orjson.JSONDecodeError:
+        return False
+
+
+def _storable_result(result):
+    """Analyzer result in the form stored in analysis_results: the JSON text itself, or free text wrapped as text_result"""
+    return result if _is_analysis_json(result) else {"text_result": result}
+
+
+def _prefilter_resumes(resume_paths, required_skills, resume_contents):
+    """NO_FIT analyses (as JSON text) for the resumes that mention too few of the required skills"""
+    rejected = {}
+    for path in resume_paths:
+        try:
+            resume_text = document_text(path, resume_contents.get(path))
+        except Exception as e:
+            print(f"Warning: Could not prefilter {Path(path).name}: {e}")
+            continue
+        analysis = prefilter(resume_text, required_skills)
+        if analysis is not None:
+            analysis["evaluation_timestamp"] = _utc_timestamp()
+            rejected[path] = orjson.dumps(analysis).decode()
+    return rejected
+
+
+async def analyze_bulk_resumes_parallel_async(jd_file_path, resume_file_paths, username=None, use_structured_output=True, max_workers=5, jd_hash=None, resume_contents=None, resume_hashes=None, on_result=None, required_skills=None):
     """
-    Analyze multiple resumes against a single job description in parallel without using Batch API.
+    Analyze multiple resumes against a single job description concurrently without using Batch API.
+
+    Structured results are cached by the content hashes of the JD and resume,
+    so a pair analyzed before is returned without calling Gemini.
+    The other resumes pass through an upload, a generate and a cleanup stage,
+    each a pool of coroutines on the running event loop using the Gemini
+    client's async interface; at most max_workers generate at once. Database
+    writes and file parsing run in worker threads so they never block the loop.
     
     Args:
-        jd_file_path (str): Path to the job description file (.pdf or .docx)
-        resume_file_paths (list): List of paths to resume files (.pdf or .docx)
+        jd_file_path (str): Path to the job description file (.pdf or .docx), or a gs:// / https:// URI of a PDF
+        resume_file_paths (list): List of paths to resume files (.pdf or .docx) or gs:// / https:// URIs of PDFs
         username (str): Username to associate with the files and analysis results
         use_structured_output (bool): Whether to use structured output with ATS schema
-        max_workers (int): Maximum number of parallel workers (threads)
+        max_workers (int): Maximum number of resumes analyzed by Gemini concurrently
+        jd_hash (str): SHA-256 of the JD contents, if the caller already computed it
+        resume_contents (dict): Resume paths mapped to their bytes, for resumes already
+            held in memory; these are never read from disk
+        resume_hashes (dict): Resume paths mapped to the SHA-256 of their contents, if
+            the caller already computed them
+        on_result (callable): Called on the event loop as on_result(resume_path, result)
+            for each cached or newly analyzed resume as soon as its result is known
+        required_skills (iterable): The job's required skills; local resumes mentioning
+            too few of them get a NO_FIT analysis without calling Gemini
         
     Returns:
         dict: Dictionary with resume paths as keys and analysis results as values
     """
-    # Helper functions
-    def _validate_file_type(path: Path):
-        if path.suffix.lower() not in {".pdf", ".docx"}:
-            raise ValueError(f"Unsupported file type: {path.suffix}. Only PDF and DOCX are supported.")
-
-    def _get_mime_type(path: Path) -> str:
-        return "application/pdf" if path.suffix.lower() == ".pdf" else "text/plain"
-
-    def _convert_docx_to_text(path: Path) -> str:
-        from docx import Document
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-    
-    # Function to process a single resume against the job description
-    def process_resume(resume_path, jd_file_path, username, use_structured_output):
-        try:
-            print(f"Processing resume: {Path(resume_path).name}")
-            # Create a new client instance per thread to avoid thread safety issues
-            client = genai.Client(api_key=GEMINI_API_KEY)
-            
-            # Get or create user if username is provided
-            user_id = None
-            if username:
-                user = db_manager.get_or_create_user(username)
-                user_id = user['id']
-            
-            # Prepare resume file
-            resume_path_obj = Path(resume_path)
-            _validate_file_type(resume_path_obj)
-            resume_file_type = resume_path_obj.suffix.lower()[1:]  # Remove the dot
-            
-            if resume_path_obj.suffix.lower() == ".docx":
-                resume_text = _convert_docx_to_text(resume_path_obj)
-                resume_io = io.BytesIO(resume_text.encode("utf-8"))
-                resume_mime_type = "text/plain"
-            else:
-                resume_io = io.BytesIO(resume_path_obj.read_bytes())
-                resume_mime_type = _get_mime_type(resume_path_obj)
-            
-            # Prepare JD file
-            jd_path_obj = Path(jd_file_path)
-            _validate_file_type(jd_path_obj)
-            jd_file_type = jd_path_obj.suffix.lower()[1:]  # Remove the dot
-            
-            if jd_path_obj.suffix.lower() == ".docx":
-                jd_text = _convert_docx_to_text(jd_path_obj)
-                jd_io = io.BytesIO(jd_text.encode("utf-8"))
-                jd_mime_type = "text/plain"
+    resume_contents = resume_contents or {}
+
+    def _prepare_resume(resume_path_obj, resume_ext, resume_data):
+        if resume_ext == ".docx":
+            if resume_data is None:
+                resume_text = _docx_text_for_file(str(resume_path_obj), resume_path_obj.stat().st_mtime_ns)
             else:
-                jd_io = io.BytesIO(jd_path_obj.read_bytes())
-                jd_mime_type = _get_mime_type(jd_path_obj)
-            
-            # Upload files
-            resume_uploaded, resume_db_file_id = upload_file_with_retry(
+                resume_text = _convert_docx_to_text(io.BytesIO(resume_data))
+            return io.BytesIO(resume_text.encode("utf-8"))
+        if resume_data is None:
+            # Streamed from disk rather than read into memory up front
+            return open(resume_path_obj, "rb")
+        return io.BytesIO(resume_data)
+
+    # Coroutine to process a single resume against the batch's shared job description cache
+    # Upload stage: make one resume referenceable by generate_content. Returns
+    # (content part, Files API handle to delete afterwards or None, database file id)
+    async def upload_resume(client, resume_path):
+        # Prepare resume file
+        resume_is_remote = is_remote_uri(resume_path)
+        resume_path_obj = Path(urlparse(resume_path).path) if resume_is_remote else Path(resume_path)
+        resume_ext = _validate_file_type(resume_path_obj)
+        resume_file_type = resume_ext[1:]  # Remove the dot
+        resume_mime_type = _EXT_TO_MIME[resume_ext]
+        
+        # Reference resumes already in cloud storage directly, send small local ones
+        # inline, and upload larger ones through the Files API
+        if resume_is_remote:
+            resume_part, resume_db_file_id = await asyncio.to_thread(
+                remote_file_part, resume_path, username=username, file_type=resume_file_type
+            )
+            return resume_part, None, resume_db_file_id
+
+        resume_io = await asyncio.to_thread(
+            _prepare_resume, resume_path_obj, resume_ext, resume_contents.get(resume_path)
+        )
+        with resume_io:
+            if _payload_size(resume_io) < INLINE_UPLOAD_MAX_BYTES:
+                resume_part, resume_db_file_id = await asyncio.to_thread(
+                    inline_file_part,
+                    resume_io,
+                    resume_mime_type,
+                    username=username,
+                    filename=resume_path_obj.name,
+                    file_type=resume_file_type
+                )
+                return resume_part, None, resume_db_file_id
+
+            resume_uploaded, resume_db_file_id = await upload_file_with_retry_async(
                 client, 
                 resume_io, 
                 resume_mime_type,
@@ -793,165 +1248,359 @@ def analyze_bulk_resumes_parallel(jd_file_path, resume_file_paths, username=None
                 filename=resume_path_obj.name,
                 file_type=resume_file_type
             )
-            
-            jd_uploaded, jd_db_file_id = upload_file_with_retry(
-                client, 
-                jd_io, 
-                jd_mime_type,
-                username=username,
-                filename=jd_path_obj.name,
-                file_type=jd_file_type
-            )
-            
-            # Wait if processing
-            while hasattr(resume_uploaded, "state") and resume_uploaded.state.name == "PROCESSING":
-                time.sleep(2)
-                resume_uploaded = client.files.get(name=resume_uploaded.name)
-                
-            while hasattr(jd_uploaded, "state") and jd_uploaded.state.name == "PROCESSING":
-                time.sleep(2)
-                jd_uploaded = client.files.get(name=jd_uploaded.name)
-            
-            # Create the analysis request
-            analysis_prompt = f"""
-{prompts.system_prompt}
 
-Please analyze the following resume against the job description and provide a comprehensive ATS evaluation.
+        # Wait if processing
+        resume_uploaded = await _wait_ready_async(client, resume_uploaded)
+        return resume_uploaded, resume_uploaded, resume_db_file_id
 
-Job Description: (see attached file)
-Resume: (see attached file)
-"""
-            
-            # Create cache with both files
-            display_name = f"Cache with {jd_path_obj.name} and {resume_path_obj.name}"
-            cache = client.caches.create(
-                model=GEMINI_MODEL,
-                config=types.CreateCachedContentConfig(
-                    display_name=display_name,
-                    system_instruction=prompts.system_prompt,
-                    contents=[jd_uploaded, resume_uploaded],
-                    ttl="1800s",
-                ),
+    # Generate stage: analyze one prepared resume against the shared JD cache, or
+    # against jd_parts sent with the request when there is no cache. Returns
+    # (result, analysis record to save or None); the records are written together
+    # once the whole batch is done
+    async def generate_result(client, resume_part, resume_db_file_id, user_id, cache_name, cache_id, jd_db_file_id, jd_parts=()):
+        analysis_record = None
+        
+        # Generate content; with a cache the resume is the only uncached part of the prompt
+        if use_structured_output:
+            response = await client.aio.models.generate_content(
+                model=get_settings().gemini_model,
+                contents=[*jd_parts, resume_part, "Analyze the resume against the job description."],
+                config=_generation_config(cache_name),
             )
             
-            # Store cache information in the database if username is provided
-            cache_id = None
-            
-            if username and user_id and jd_db_file_id and resume_db_file_id:
-                cache_id = db_manager.save_cache_record(
-                    user_id=user_id,
-                    cache_name=cache.name,
-                    display_name=display_name,
-                    jd_file_id=jd_db_file_id,
-                    resume_file_id=resume_db_file_id,
-                    ttl=1800
-                )
-            
-            # Generate content
-            if use_structured_output:
-                response = client.models.generate_content(
-                    model=GEMINI_MODEL,
-                    contents="Analyze the resume against the job description.",
-                    config=types.GenerateContentConfig(
-                        cached_content=cache.name,
-                        response_schema=ATS_SCHEMA,
-                        response_mime_type="application/json"
-                    ),
-                )
-                
-                # Parse JSON response
-                try:
-                    result_data = json.loads(response.text)
-                    current_time = datetime.now().isoformat() + "Z"
-                    result_data["evaluation_timestamp"] = current_time
-                    result_json = json.dumps(result_data, indent=2)
-                    
-                    # Store the analysis result in the database if username is provided
-                    if username and user_id and cache_id and jd_db_file_id and resume_db_file_id:
-                        db_manager.save_analysis_result(
-                            user_id=user_id,
-                            cache_id=cache_id,
-                            jd_file_id=jd_db_file_id,
-                            resume_file_id=resume_db_file_id,
-                            result_json=result_json
-                        )
-                    
-                    result = result_json
-                except json.JSONDecodeError:
-                    result = response.text
-            else:
-                response = client.models.generate_content(
-                    model=GEMINI_MODEL,
-                    contents=analysis_prompt,
-                    config=types.GenerateContentConfig(cached_content=cache.name),
-                )
-                result_text = response.text
+            # Parse JSON response
+            try:
+                result_data = orjson.loads(response.text)
+                current_time = _utc_timestamp()
+                result_data["evaluation_timestamp"] = current_time
+                # Compact output; the result is stored and parsed again, never read by people
+                result_json = orjson.dumps(result_data).decode()
                 
                 # Store the analysis result in the database if username is provided
-                if username and user_id and cache_id and jd_db_file_id and resume_db_file_id:
-                    db_manager.save_analysis_result(
-                        user_id=user_id,
-                        cache_id=cache_id,
-                        jd_file_id=jd_db_file_id,
-                        resume_file_id=resume_db_file_id,
-                        result_json=json.dumps({"text_result": result_text})
-                    )
+                if username and user_id and jd_db_file_id and resume_db_file_id:
+                    analysis_record = {
+                        'cache_id': cache_id,
+                        'jd_file_id': jd_db_file_id,
+                        'resume_file_id': resume_db_file_id,
+                        'result': result_data
+                    }
                 
-                result = result_text
-            
-            # Clean up uploaded files
-            try:
-                client.files.delete(name=resume_uploaded.name)
-                client.files.delete(name=jd_uploaded.name)
-            except Exception as e:
-                print(f"Warning: Could not clean up files for {resume_path_obj.name}: {e}")
-            
-            print(f"Completed: {resume_path_obj.name}")
-            return resume_path, result
-            
-        except Exception as e:
-            print(f"Error processing {resume_path}: {e}")
-            return resume_path, f"Error: {str(e)}"
+                return result_json, analysis_record
+            except orjson.JSONDecodeError:
+                return response.text, None
+
+        response = await client.aio.models.generate_content(
+            model=get_settings().gemini_model,
+            contents=[*jd_parts, resume_part, ANALYSIS_PROMPT],
+            config=_generation_config(cache_name, structured=False),
+        )
+        result_text = response.text
+        
+        # Store the analysis result in the database if username is provided
+        if username and user_id and jd_db_file_id and resume_db_file_id:
+            analysis_record = {
+                'cache_id': cache_id,
+                'jd_file_id': jd_db_file_id,
+                'resume_file_id': resume_db_file_id,
+                'result': {"text_result": result_text}
+            }
+        
+        return result_text, analysis_record
     
+    # Hash the JD once so every worker shares the same prepared payload
+    jd_is_remote = is_remote_uri(jd_file_path)
+    if jd_hash is None and not jd_is_remote:
+        jd_hash = await asyncio.to_thread(sha256_file, jd_file_path)
+
+    start_time = time.time()
+    results = {}
+
+    # Look the user up once for the whole batch
+    user_id = None
+    if username:
+        user = await asyncio.to_thread(db_manager.get_or_create_user, username)
+        user_id = user['id']
+
+    # Serve (JD, resume) pairs analyzed before from the analysis cache; only
+    # structured results of local files are cached
+    cache_keys = {}
+    if use_structured_output and not jd_is_remote:
+        local_paths = [path for path in resume_file_paths if not is_remote_uri(path)]
+        hashes = await asyncio.to_thread(_resume_hashes, local_paths, resume_hashes or {}, resume_contents)
+        cache_keys = {path: analysis_cache_key(jd_hash, resume_hash) for path, resume_hash in hashes.items()}
+        try:
+            cached = await asyncio.to_thread(lookup_cached_analyses, list(cache_keys.values()))
+        except Exception as e:
+            print(f"Warning: Could not read the analysis cache: {e}")
+            cached = {}
+        results = {path: cached[key] for path, key in cache_keys.items() if key in cached}
+        if results:
+            print(f"Reusing {len(results)} cached analyses")
+            if on_result is not None:
+                for path, result_json in results.items():
+                    on_result(path, result_json)
+            # Cached analyses still go into the user's history, like fresh ones
+            if user_id:
+                await asyncio.to_thread(
+                    db_manager.save_analysis_results_bulk,
+                    user_id,
+                    [
+                        {'cache_id': None, 'jd_file_id': None, 'resume_file_id': None, 'result': result_json}
+                        for result_json in results.values()
+                    ]
+                )
+
+    # Reject resumes that mention too few of the required skills without
+    # calling Gemini. Their analyses depend on the skills list, which isn't
+    # part of the cache key, so they are recorded but never cached
+    if required_skills:
+        local_pending = [path for path in resume_file_paths if path not in results and not is_remote_uri(path)]
+        rejected = await asyncio.to_thread(_prefilter_resumes, local_pending, required_skills, resume_contents)
+        if rejected:
+            print(f"Prefilter rejected {len(rejected)} resumes")
+            results.update(rejected)
+            if on_result is not None:
+                for path, result_json in rejected.items():
+                    on_result(path, result_json)
+            if user_id:
+                await asyncio.to_thread(
+                    db_manager.save_analysis_results_bulk,
+                    user_id,
+                    [
+                        {'cache_id': None, 'jd_file_id': None, 'resume_file_id': None, 'result': result_json}
+                        for result_json in rejected.values()
+                    ]
+                )
+
+    pending = [path for path in resume_file_paths if path not in results]
+    if not pending:
+        return results
+
     # Print start information
-    print(f"Starting parallel analysis of {len(resume_file_paths)} resumes...")
+    print(f"Starting parallel analysis of {len(pending)} resumes...")
     print(f"Maximum parallel workers: {max_workers}")
     
-    # Create a progress counter with thread safety
-    progress_lock = threading.Lock()
-    completed_count = 0
-    total_count = len(resume_file_paths)
-    
-    def update_progress(future):
-        nonlocal completed_count
-        with progress_lock:
+    total_count = len(pending)
+
+    # One client for the whole batch keeps its connection pool warm across resumes.
+    # Not _get_client(): its async transport must not outlive this event loop,
+    # and the synchronous wrapper runs each batch on a fresh one
+    client = genai.Client(api_key=get_settings().gemini_api_key)
+
+    # A context cache for this JD created by an earlier batch, if still live, makes
+    # the JD upload and cache creation below unnecessary
+    jd_path_obj = Path(urlparse(jd_file_path).path) if jd_is_remote else Path(jd_file_path)
+    index_key = f"{jd_hash}-{ANALYSIS_CACHE_VERSION}" if not jd_is_remote else None
+    cache_name = await _reuse_indexed_cache(client, index_key) if index_key else None
+
+    # The JD is identical for every resume, so upload it exactly once for the batch
+    jd_uploaded = None
+    try:
+        if cache_name is not None:
+            print(f"Reusing context cache {cache_name} for {jd_path_obj.name}")
+            jd_db_file_id = None
+            if username:
+                jd_ext = _validate_file_type(jd_path_obj)
+                jd_db_file_id = await asyncio.to_thread(
+                    _save_uploaded_file_record, username, jd_path_obj.name, jd_ext[1:], _EXT_TO_MIME[jd_ext], None
+                )
+        elif jd_is_remote:
+            jd_part, jd_db_file_id = await asyncio.to_thread(
+                remote_file_part, jd_file_path, username=username, file_type="pdf"
+            )
+        else:
+            jd_context = await asyncio.to_thread(get_or_build_jd_context, jd_hash, jd_file_path)
+            jd_uploaded, jd_db_file_id = await upload_file_with_retry_async(
+                client,
+                io.BytesIO(jd_context["data"]),
+                jd_context["mime_type"],
+                username=username,
+                filename=jd_path_obj.name,
+                file_type=jd_context["file_type"]
+            )
+            jd_uploaded = await _wait_ready_async(client, jd_uploaded)
+            jd_part = jd_uploaded
+    except Exception as e:
+        print(f"Error uploading job description {jd_path_obj.name}: {e}")
+        results.update((resume_path, f"Error: {str(e)}") for resume_path in pending)
+        return results
+
+    # Caches recorded in the index outlive the batch and expire through their TTL;
+    # only an unrecorded one (for a JD given by URI) is deleted at the end
+    owned_cache_name = None
+    try:
+        display_name = f"Cache with {jd_path_obj.name}"
+        # The JD parts sent with every request when it isn't cached
+        jd_parts = ()
+        if cache_name is None:
+            # Cache only the invariant prefix (system prompt + JD) so every resume reuses it
+            try:
+                cache = await client.aio.caches.create(
+                    model=get_settings().gemini_model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=display_name,
+                        system_instruction=prompts.SYSTEM_PROMPT_PART,
+                        contents=[jd_part],
+                        ttl=f"{JD_CONTEXT_CACHE_TTL}s",
+                    ),
+                )
+            except Exception as e:
+                # E.g. a short JD leaving the prefix under the model's minimum
+                # cacheable token count: send the prompt and JD with each request
+                print(f"Warning: Could not cache {jd_path_obj.name}, analyzing without a cache: {e}")
+                jd_parts = (jd_part,)
+            else:
+                cache_name = cache.name
+                if index_key:
+                    await asyncio.to_thread(_write_cache_index, index_key, cache_name)
+                else:
+                    owned_cache_name = cache_name
+
+        # Store cache information in the database if username is provided
+        cache_id = None
+        if user_id and jd_db_file_id and cache_name is not None:
+            cache_id = await asyncio.to_thread(
+                db_manager.save_cache_record,
+                user_id=user_id,
+                cache_name=cache_name,
+                display_name=display_name,
+                jd_file_id=jd_db_file_id,
+                resume_file_id=None,
+                ttl=JD_CONTEXT_CACHE_TTL
+            )
+
+        # Resumes flow through upload, generate and cleanup stages connected by
+        # queues, each with its own worker pool: later resumes upload while earlier
+        # ones generate, and deleting uploads never holds a generation slot. The
+        # bounded generate queue caps how many prepared resumes wait in memory.
+        upload_queue = asyncio.Queue()
+        generate_queue = asyncio.Queue(maxsize=2 * max(1, max_workers))
+        cleanup_queue = asyncio.Queue()
+        analysis_records = []
+        completed_count = 0
+
+        def _finish(resume_path, result, analysis_record=None):
+            nonlocal completed_count
             completed_count += 1
+            results[resume_path] = result
+            if analysis_record is not None:
+                analysis_records.append(analysis_record)
+            if on_result is not None:
+                on_result(resume_path, result)
             print(f"Progress: {completed_count}/{total_count} resumes processed ({completed_count/total_count*100:.1f}%)")
-    
-    # Process resumes in parallel
-    start_time = time.time()
-    results = {}
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_resume = {
-            executor.submit(
-                process_resume, resume_path, jd_file_path, username, use_structured_output
-            ): resume_path for resume_path in resume_file_paths
+
+        async def upload_worker():
+            while True:
+                resume_path = await upload_queue.get()
+                if resume_path is None:
+                    return
+                print(f"Processing resume: {Path(resume_path).name}")
+                try:
+                    upload = await upload_resume(client, resume_path)
+                except Exception as e:
+                    print(f"Error processing {resume_path}: {e}")
+                    _finish(resume_path, f"Error: {str(e)}")
+                    continue
+                try:
+                    await generate_queue.put((resume_path, upload))
+                except asyncio.CancelledError:
+                    # Stopped while waiting for room: hand the upload to the final cleanup
+                    if upload[1] is not None:
+                        cleanup_queue.put_nowait(upload[1].name)
+                    raise
+
+        async def generate_worker():
+            while True:
+                item = await generate_queue.get()
+                if item is None:
+                    return
+                resume_path, (resume_part, resume_uploaded, resume_db_file_id) = item
+                try:
+                    result, analysis_record = await generate_result(
+                        client, resume_part, resume_db_file_id, user_id, cache_name, cache_id, jd_db_file_id, jd_parts
+                    )
+                    print(f"Completed: {Path(resume_path).name}")
+                except Exception as e:
+                    print(f"Error processing {resume_path}: {e}")
+                    result, analysis_record = f"Error: {str(e)}", None
+                finally:
+                    # Clean up the uploaded resume, even if the batch is cancelled
+                    # mid-generation; the shared JD is deleted once the batch is done
+                    if resume_uploaded is not None:
+                        cleanup_queue.put_nowait(resume_uploaded.name)
+                _finish(resume_path, result, analysis_record)
+
+        async def cleanup_worker():
+            while True:
+                file_name = await cleanup_queue.get()
+                if file_name is None:
+                    return
+                await _delete_uploaded_files_async(client, [file_name])
+
+        # The task group cancels and awaits every worker if the batch is cancelled
+        # (e.g. the client streaming the results disconnected) or a worker fails
+        try:
+            async with asyncio.TaskGroup() as workers:
+                uploaders = [workers.create_task(upload_worker()) for _ in range(min(PARALLEL_UPLOAD_WORKERS, total_count))]
+                generators = [workers.create_task(generate_worker()) for _ in range(max(1, min(max_workers, total_count)))]
+                cleaners = [workers.create_task(cleanup_worker()) for _ in range(PARALLEL_CLEANUP_WORKERS)]
+
+                # Drain the stages in order; a None tells one worker its input is exhausted
+                for resume_path in pending:
+                    upload_queue.put_nowait(resume_path)
+                for _ in uploaders:
+                    upload_queue.put_nowait(None)
+                await asyncio.gather(*uploaders)
+                for _ in generators:
+                    await generate_queue.put(None)
+                await asyncio.gather(*generators)
+                for _ in cleaners:
+                    cleanup_queue.put_nowait(None)
+                await asyncio.gather(*cleaners)
+        finally:
+            # Resumes uploaded but never generated, or queued for a deletion that
+            # never ran, are only left over when the workers were stopped early
+            leftover = []
+            while not generate_queue.empty():
+                item = generate_queue.get_nowait()
+                if item is not None and item[1][1] is not None:
+                    leftover.append(item[1][1].name)
+            while not cleanup_queue.empty():
+                file_name = cleanup_queue.get_nowait()
+                if file_name is not None:
+                    leftover.append(file_name)
+            if leftover:
+                await _delete_uploaded_files_async(client, leftover)
+
+        # Store every analysis result in one statement
+        if analysis_records:
+            try:
+                await asyncio.to_thread(db_manager.save_analysis_results_bulk, user_id, analysis_records)
+            except Exception as e:
+                print(f"Warning: Could not store analysis results: {e}")
+
+        # Failed analyses come back as plain error strings; only cache real results
+        successful = {
+            cache_keys[path]: results[path]
+            for path in pending
+            if path in cache_keys and _is_analysis_json(results[path])
         }
-        
-        # Add progress tracking callback
-        for future in future_to_resume:
-            future.add_done_callback(update_progress)
-        
-        # Collect results as they complete
-        for future in concurrent.futures.as_completed(future_to_resume):
+        if successful:
             try:
-                resume_path, result = future.result()
-                results[resume_path] = result
+                await asyncio.to_thread(store_cached_analyses, successful)
             except Exception as e:
-                resume_path = future_to_resume[future]
-                results[resume_path] = f"Unexpected error: {str(e)}"
+                print(f"Warning: Could not update the analysis cache: {e}")
+    except Exception as e:
+        print(f"Error creating job description cache for {jd_path_obj.name}: {e}")
+        # Keep the results already reported through _finish and on_result
+        results.update((resume_path, f"Error: {str(e)}") for resume_path in pending if resume_path not in results)
+        return results
+    finally:
+        await _delete_uploaded_files_async(
+            client,
+            [jd_uploaded.name] if jd_uploaded is not None else [],
+            cache_names=[owned_cache_name] if owned_cache_name is not None else ()
+        )
     
     end_time = time.time()
     print(f"Parallel processing completed in {end_time - start_time:.2f} seconds")
@@ -959,10 +1608,94 @@ Resume: (see attached file)
     return results
 
 
-# Example code for parallel resume analysis with all sample resumes
-# To run this code, uncomment it and run this module directly
+def analyze_bulk_resumes_parallel(jd_file_path, resume_file_paths, username=None, use_structured_output=True, max_workers=5, jd_hash=None, resume_contents=None, resume_hashes=None):
+    """
+    Analyze multiple resumes against a single job description in parallel without using Batch API.
+
+    Synchronous entry point that runs analyze_bulk_resumes_parallel_async on a
+    new event loop; code already running in an event loop should await that
+    coroutine directly.
+    
+    Args:
+        jd_file_path (str): Path to the job description file (.pdf or .docx), or a gs:// / https:// URI of a PDF
+        resume_file_paths (list): List of paths to resume files (.pdf or .docx) or gs:// / https:// URIs of PDFs
+        username (str): Username to associate with the files and analysis results
+        use_structured_output (bool): Whether to use structured output with ATS schema
+        max_workers (int): Maximum number of resumes analyzed by Gemini concurrently
+        jd_hash (str): SHA-256 of the JD contents, if the caller already computed it
+        resume_contents (dict): Resume paths mapped to their bytes, for resumes already
+            held in memory; these are never read from disk
+        resume_hashes (dict): Resume paths mapped to the SHA-256 of their contents, if
+            the caller already computed them
+        
+    Returns:
+        dict: Dictionary with resume paths as keys and analysis results as values
+    """
+    return asyncio.run(analyze_bulk_resumes_parallel_async(
+        jd_file_path,
+        resume_file_paths,
+        username=username,
+        use_structured_output=use_structured_output,
+        max_workers=max_workers,
+        jd_hash=jd_hash,
+        resume_contents=resume_contents,
+        resume_hashes=resume_hashes
+    ))
+
+
+# Batch sizes at which analyze_resumes switches from the parallel path to the
+# Batch API (about half the cost, but a job can take minutes to hours), and
+# from inline batch requests to a JSONL request file
+BATCH_INLINE_MIN_RESUMES = 10
+BATCH_FILE_MIN_RESUMES = 50
+
+
+def analyze_resumes(jd_file_path, resume_file_paths, username=None, use_structured_output=True, max_workers=5):
+    """
+    Analyze resumes against a job description with the method suited to the batch size.
+
+    Fewer than BATCH_INLINE_MIN_RESUMES resumes, or any referenced by URI, go
+    through analyze_bulk_resumes_parallel for the lowest latency. Larger
+    batches use the Batch API through analyze_bulk_resumes, with inline
+    requests below BATCH_FILE_MIN_RESUMES and a request file from there on.
+    Latency-sensitive callers such as the upload routes should call the
+    parallel analyzer directly.
+    
+    Args:
+        jd_file_path (str): Path to the job description file (.pdf or .docx)
+        resume_file_paths (list): List of paths to resume files (.pdf or .docx)
+        username (str): Username to associate with the files and analysis results
+        use_structured_output (bool): Whether to use structured output with ATS schema
+        max_workers (int): Maximum number of resumes processed concurrently on the parallel path
+        
+    Returns:
+        dict: Dictionary with resume paths as keys and analysis results as values
+    """
+    resume_count = len(resume_file_paths)
+    if (resume_count < BATCH_INLINE_MIN_RESUMES or is_remote_uri(jd_file_path)
+            or any(is_remote_uri(path) for path in resume_file_paths)):
+        return analyze_bulk_resumes_parallel(
+            jd_file_path,
+            resume_file_paths,
+            username=username,
+            use_structured_output=use_structured_output,
+            max_workers=max_workers
+        )
+    return analyze_bulk_resumes(
+        jd_file_path,
+        resume_file_paths,
+        username=username,
+        use_structured_output=use_structured_output,
+        batch_method="file" if resume_count >= BATCH_FILE_MIN_RESUMES else "inline"
+    )
+
+
+# Example code for resume analysis with all sample resumes
+# To run this code, run this module from the Backend directory with
+# `python -m utils.context_caching`
 if __name__ == "__main__":
-    parallel_results = analyze_bulk_resumes_parallel(
+    db_manager.init_db()
+    parallel_results = analyze_resumes(
         "D:\\Coding\\Context-cache-system\\samples\\sample_jd_1.pdf",
         [
             "D:\\Coding\\Context-cache-system\\samples\\resume_1.pdf",
@@ -980,29 +1713,20 @@ if __name__ == "__main__":
         max_workers=5
     )
 
-    print("\n=== Parallel Resume Analysis Results ===")
-
-    # Create a dictionary to store all results
-    results = {"results": []}
-
-    for resume_path, result in parallel_results.items():
-        # Print condensed result without file name
-        print("\n--- Analysis Result ---")
-        print(result)
-        
-        # Parse the JSON string and add to the results list
+    def _result_entry(result):
+        # Store each result parsed; anything that is not JSON is kept as an error string
         try:
-            result_data = json.loads(result)
-            results["results"].append(result_data)
-        except json.JSONDecodeError:
-            # If not valid JSON, store as string
-            results["results"].append({"error": result})
+            return orjson.loads(result)
+        except orjson.JSONDecodeError:
+            return {"error": result}
+
+    results = {"results": [_result_entry(result) for result in parallel_results.values()]}
 
     # Save all results to a single JSON file
-    with open('data.json', 'w') as f:
-        json.dump(results, f, indent=2)
+    with open('data.json', 'wb') as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
-    print(f"\nAll results saved to data.json")
+    print(f"\n{len(results['results'])} results saved to data.json")
 
 # Uncomment to run the batch API analysis with all sample resumes
 
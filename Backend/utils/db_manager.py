@@ -1,8 +1,15 @@
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-import json
-from datetime import datetime
+import psycopg2.pool
+import copy
+import functools
+import orjson
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -16,29 +23,289 @@ DB_NAME = os.getenv('POSTGRES_DB', 'context_cache')
 DB_USER = os.getenv('POSTGRES_USER', 'postgres')
 DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
 
-def get_db_connection():
-    """Create a connection to the PostgreSQL database"""
+# Session settings applied to every connection. Commits wait for their WAL
+# flush by default; deployments that can afford to lose the last few hundred
+# milliseconds of writes in a server crash may set 'off' for faster commits
+# (data is never corrupted, only recent commits can be lost).
+DB_SYNCHRONOUS_COMMIT = os.getenv('POSTGRES_SYNCHRONOUS_COMMIT', 'on')
+DB_SESSION_OPTIONS = f'-c synchronous_commit={DB_SYNCHRONOUS_COMMIT}'
+
+# How long a cached (JD, resume) analysis stays valid
+ANALYSIS_CACHE_TTL_DAYS = int(os.getenv('ANALYSIS_CACHE_TTL_DAYS', '30'))
+
+# get_user_data answers repeated reads of the same user from a process-local
+# LRU for up to USER_DATA_CACHE_TTL seconds; update_user_data drops the entry
+# so this process never serves its own stale writes
+USER_DATA_CACHE_SIZE = int(os.getenv('USER_DATA_CACHE_SIZE', '10000'))
+USER_DATA_CACHE_TTL = float(os.getenv('USER_DATA_CACHE_TTL', '60'))
+
+# Connections are pooled per process so each call skips the TCP, TLS and auth
+# handshake of a fresh connect. ThreadedConnectionPool raises PoolError rather
+# than waiting when all connections are in use, so the maximum should exceed
+# the number of threads that touch the database at once.
+DB_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', '2'))
+DB_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', '20'))
+
+# Rows per multi-row INSERT statement in the bulk save_* functions
+BULK_PAGE_SIZE = int(os.getenv('POSTGRES_BULK_PAGE_SIZE', '200'))
+
+class FastJson(psycopg2.extras.Json):
+    """Json adapter that serializes with orjson instead of the stdlib json module"""
+
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode()
+
+# Dicts passed as query parameters are stored as JSON through FastJson
+psycopg2.extensions.register_adapter(dict, FastJson)
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which of the PREPARED_STATEMENTS its session has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Create the connection pool on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    options=DB_SESSION_OPTIONS,
+                    connection_factory=PreparingConnection,
+                    # Return dictionary-like rows
+                    cursor_factory=psycopg2.extras.RealDictCursor
+                )
+    return _pool
+
+def get_db_connection(autocommit=True):
+    """Take a connection to the PostgreSQL database from the pool; hand it back with release_db_connection"""
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        # Return dictionary-like rows
-        conn.cursor_factory = psycopg2.extras.RealDictCursor
+        conn = _get_pool().getconn()
+        # In autocommit mode a single statement is its own transaction, which
+        # saves the BEGIN and COMMIT/ROLLBACK round trips psycopg2 otherwise
+        # sends around it; code running several statements that must apply
+        # together asks for autocommit=False
+        conn.autocommit = autocommit
         return conn
     except psycopg2.Error as e:
         print(f"Database connection error: {e}")
         raise
 
+def release_db_connection(conn):
+    """Return a connection to the pool, rolling back any transaction left open"""
+    # The pool rolls back unfinished transactions and discards closed connections
+    _get_pool().putconn(conn)
+
+@contextmanager
+def transaction():
+    """Yield a connection whose writes are committed together on exit, or rolled back on error"""
+    conn = get_db_connection(autocommit=False)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+# Selects a user's rows from one of the record tables together with the
+# filenames of the JD and resume files each row refers to
+_RECORDS_WITH_FILENAMES_SQL = '''
+SELECT records.*, jd.filename AS jd_filename, resume.filename AS resume_filename
+FROM {table} AS records
+LEFT JOIN files AS jd ON jd.user_id = records.user_id AND jd.id = records.jd_file_id
+LEFT JOIN files AS resume ON resume.user_id = records.user_id AND resume.id = records.resume_file_id
+WHERE records.user_id = $1
+'''
+
+# The frequently run queries, prepared once per pooled connection so later
+# calls skip the server's parse and plan steps. LIMIT NULL returns every row.
+PREPARED_STATEMENTS = {
+    'create_user': '''
+        INSERT INTO user_data (user_id) VALUES ($1)
+        ON CONFLICT (user_id) DO NOTHING
+    ''',
+    'get_user_files': '''
+        SELECT * FROM files
+        WHERE user_id = $1 AND ($2::text IS NULL OR file_type = $2)
+        ORDER BY upload_timestamp DESC, id DESC
+        LIMIT $3
+    ''',
+    'get_user_caches': _RECORDS_WITH_FILENAMES_SQL.format(table='caches') + '''
+        ORDER BY records.created_at DESC, records.id DESC
+        LIMIT $2
+    ''',
+    'get_user_analysis_results': _RECORDS_WITH_FILENAMES_SQL.format(table='analysis_results') + '''
+        ORDER BY records.processed_at DESC, records.id DESC
+        LIMIT $2
+    ''',
+    'get_analysis_result_by_id': _RECORDS_WITH_FILENAMES_SQL.format(table='analysis_results') + '''
+        AND records.id = $2
+    ''',
+    'update_batch_job_status': '''
+        UPDATE batch_jobs
+        SET job_state = $1,
+            completed_at = COALESCE($2, CASE WHEN $1 IN (
+                'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED',
+                'JOB_STATE_ERROR'
+            ) THEN CURRENT_TIMESTAMP END)
+        WHERE user_id = $3 AND id = $4
+    ''',
+    'get_user_batch_jobs': '''
+        SELECT * FROM batch_jobs
+        WHERE user_id = $1
+        ORDER BY created_at DESC, id DESC
+        LIMIT $2
+    ''',
+    'get_user_data': 'SELECT user_id, data, created_at, updated_at FROM user_data WHERE user_id = $1',
+    'update_user_data': '''
+        UPDATE user_data
+        SET data = $1, updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = $2
+    ''',
+    'get_cached_analyses': '''
+        SELECT cache_key, result_json FROM analysis_cache
+        WHERE cache_key = ANY($1::text[])
+        AND created_at > CURRENT_TIMESTAMP - make_interval(days => $2)
+    ''',
+}
+
+def _execute_prepared(cursor, name, params):
+    """Run one of the PREPARED_STATEMENTS, preparing it first if this connection has not yet"""
+    conn = cursor.connection
+    if name not in conn.prepared:
+        # Prepared statements belong to the session, not the transaction, so
+        # they survive rollbacks and are only lost with the connection itself
+        cursor.execute(f'PREPARE {name} AS {PREPARED_STATEMENTS[name]}')
+        conn.prepared.add(name)
+    cursor.execute(f'EXECUTE {name} ({", ".join(["%s"] * len(params))})', params)
+
+# Tables that replaced the arrays of the same name in user_data.data
+RECORD_TABLES = ('files', 'caches', 'analysis_results', 'batch_jobs')
+
+def _migrate_user_data_records(cursor):
+    """Move records still stored in user_data.data arrays into their tables, keeping their ids"""
+    for table in RECORD_TABLES:
+        # Generated columns are computed by the database and cannot be inserted
+        cursor.execute('''
+        SELECT string_agg(quote_ident(column_name), ', ' ORDER BY ordinal_position) AS columns
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+        ''', (table,))
+        columns = cursor.fetchone()['columns']
+
+        # jsonb_populate_record maps each record's keys onto the table's columns
+        cursor.execute(f'''
+        INSERT INTO {table} ({columns})
+        SELECT {columns}
+        FROM user_data,
+             jsonb_array_elements(data->'{table}') AS records(record),
+             jsonb_populate_record(NULL::{table}, record || jsonb_build_object('user_id', user_data.user_id)) AS migrated
+        WHERE data ? '{table}'
+        ON CONFLICT DO NOTHING
+        ''')
+        migrated = cursor.rowcount
+        if migrated > 0:
+            # Continue numbering after the migrated ids
+            cursor.execute(f'''
+            SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}
+            ''')
+            print(f"Migrated {migrated} {table} records out of user_data.")
+
+    cursor.execute('''
+    UPDATE user_data
+    SET data = data - 'files' - 'caches' - 'analysis_results' - 'batch_jobs'
+    WHERE data ?| %s
+    ''', (list(RECORD_TABLES),))
+
+# Score and recommendation are derived from the stored result by the database
+ANALYSIS_SCORE_SQL = (
+    "CASE WHEN jsonb_typeof(result_json->'overall_fit_score') = 'number' "
+    "THEN (result_json->>'overall_fit_score')::double precision END"
+)
+ANALYSIS_RECOMMENDATION_SQL = "result_json->>'recommendation'"
+
+def _upgrade_analysis_results(cursor):
+    """Convert an analysis_results table with TEXT results and stored score columns to JSONB and generated columns"""
+    cursor.execute('''
+    SELECT column_name, data_type, is_generated
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'analysis_results'
+    AND column_name IN ('result_json', 'score')
+    ''')
+    columns = {row['column_name']: row for row in cursor.fetchall()}
+
+    if columns['result_json']['data_type'] == 'text':
+        # Stored as JSON strings for now; _parse_string_results parses them
+        cursor.execute('''
+        ALTER TABLE analysis_results ALTER COLUMN result_json TYPE JSONB USING to_jsonb(result_json)
+        ''')
+        print("Converted analysis_results.result_json to JSONB.")
+
+    if columns['score']['is_generated'] == 'NEVER':
+        cursor.execute(f'''
+        ALTER TABLE analysis_results
+            DROP COLUMN score,
+            DROP COLUMN recommendation,
+            ADD COLUMN score DOUBLE PRECISION GENERATED ALWAYS AS ({ANALYSIS_SCORE_SQL}) STORED,
+            ADD COLUMN recommendation TEXT GENERATED ALWAYS AS ({ANALYSIS_RECOMMENDATION_SQL}) STORED
+        ''')
+        print("Made analysis_results.score and recommendation generated columns.")
+
+def _parse_string_results(cursor):
+    """Replace results stored as JSON strings with the JSON they contain, or {"text_result": ...} for plain text"""
+    # Each cast is tried in its own block, since a failed cast would otherwise
+    # abort the whole statement (pg_input_is_valid needs PostgreSQL 16+)
+    cursor.execute('''
+    DO $$
+    DECLARE
+        rec RECORD;
+    BEGIN
+        FOR rec IN
+            SELECT user_id, id, result_json #>> '{}' AS result_text
+            FROM analysis_results
+            WHERE jsonb_typeof(result_json) = 'string'
+        LOOP
+            BEGIN
+                UPDATE analysis_results SET result_json = rec.result_text::jsonb
+                WHERE user_id = rec.user_id AND id = rec.id;
+            EXCEPTION WHEN invalid_text_representation THEN
+                UPDATE analysis_results SET result_json = jsonb_build_object('text_result', rec.result_text)
+                WHERE user_id = rec.user_id AND id = rec.id;
+            END;
+        END LOOP;
+    END
+    $$
+    ''')
+
+# Advisory lock key held while init_db runs, so processes starting together
+# apply the schema one at a time instead of racing on the same DDL
+INIT_DB_LOCK_KEY = 0x7265_7375_6d65
+
 def init_db():
     """Initialize the database with the simplified user_data table"""
-    conn = get_db_connection()
+    conn = get_db_connection(autocommit=False)
 
     try:
         with conn.cursor() as cursor:
+            # Wait for any other process initializing the schema; the lock is
+            # released when this transaction ends, and by then everything below
+            # already exists, so later processes only re-check it
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (INIT_DB_LOCK_KEY,))
+
             # Create the simplified user_data table with only 2 columns
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_data (
@@ -49,14 +316,96 @@ def init_db():
             )
             ''')
 
-            # Create an index on user_id for faster lookups
+            # user_id is the primary key, whose unique index already serves
+            # lookups; drop the duplicate index older deployments created
+            cursor.execute('''
+            DROP INDEX IF EXISTS idx_user_data_user_id
+            ''')
+
+            # Index the data JSONB column for containment (@>) queries. jsonb_path_ops
+            # only supports @>, which is all the lookups use, and is much smaller
+            # and cheaper to update than the default jsonb_ops index it replaces
+            cursor.execute('''
+            DROP INDEX IF EXISTS idx_user_data_data
+            ''')
             cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_user_data_user_id ON user_data(user_id)
+            CREATE INDEX IF NOT EXISTS idx_user_data_data_path ON user_data USING GIN(data jsonb_path_ops)
             ''')
 
-            # Create an index on the data JSONB column for efficient queries
+            # Each user's files, caches, analysis results and batch jobs are rows
+            # of their own table, so saving one is a single-row INSERT and reads
+            # filter, sort and limit through a btree index, whatever the history size
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                user_id TEXT NOT NULL REFERENCES user_data(user_id) ON DELETE CASCADE,
+                id SERIAL,
+                filename TEXT,
+                file_path TEXT,
+                file_type TEXT,
+                mime_type TEXT,
+                gemini_file_id TEXT,
+                upload_timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, id)
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS caches (
+                user_id TEXT NOT NULL REFERENCES user_data(user_id) ON DELETE CASCADE,
+                id SERIAL,
+                cache_name TEXT,
+                display_name TEXT,
+                jd_file_id INTEGER,
+                resume_file_id INTEGER,
+                ttl INTEGER,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, id)
+            )
+            ''')
+            cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS analysis_results (
+                user_id TEXT NOT NULL REFERENCES user_data(user_id) ON DELETE CASCADE,
+                id SERIAL,
+                cache_id INTEGER,
+                jd_file_id INTEGER,
+                resume_file_id INTEGER,
+                result_json JSONB,
+                score DOUBLE PRECISION GENERATED ALWAYS AS ({ANALYSIS_SCORE_SQL}) STORED,
+                recommendation TEXT GENERATED ALWAYS AS ({ANALYSIS_RECOMMENDATION_SQL}) STORED,
+                processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, id)
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                user_id TEXT NOT NULL REFERENCES user_data(user_id) ON DELETE CASCADE,
+                id SERIAL,
+                job_name TEXT,
+                job_state TEXT,
+                num_requests INTEGER,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP WITH TIME ZONE,
+                PRIMARY KEY (user_id, id)
+            )
+            ''')
+
+            # Newest-first listings of a user's records
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_user_uploaded ON files(user_id, upload_timestamp DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_caches_user_created ON caches(user_id, created_at DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_user_processed ON analysis_results(user_id, processed_at DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_batch_jobs_user_created ON batch_jobs(user_id, created_at DESC)')
+
+            _upgrade_analysis_results(cursor)
+            _migrate_user_data_records(cursor)
+            _parse_string_results(cursor)
+
+            # Create the analysis cache, shared by all users and keyed by the
+            # content hashes of the JD/resume pair (see context_caching.analysis_cache_key)
             cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_user_data_data ON user_data USING GIN(data)
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                cache_key TEXT PRIMARY KEY,
+                result_json TEXT NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
             ''')
 
         conn.commit()
@@ -66,26 +415,19 @@ def init_db():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
+# User rows are never deleted, so once a username has been seen (or created)
+# the lookup is skipped for the rest of the process
+@functools.lru_cache(maxsize=4096)
 def get_or_create_user(username):
     """Get a user by username or create if not exists"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            # Try to get existing user
-            cursor.execute('SELECT user_id, data FROM user_data WHERE user_id = %s', (username,))
-            user = cursor.fetchone()
-
-            if user:
-                return {'id': user['user_id'], 'username': user['user_id']}
-
-            # Create new user if not exists
-            cursor.execute('''
-            INSERT INTO user_data (user_id, data)
-            VALUES (%s, %s)
-            ON CONFLICT (user_id) DO NOTHING
-            ''', (username, psycopg2.extras.Json({})))
+            # Create the user unless it already exists; one statement either way,
+            # with no window between a lookup and the insert
+            _execute_prepared(cursor, 'create_user', (username,))
 
             conn.commit()
             return {'id': username, 'username': username}
@@ -94,368 +436,255 @@ def get_or_create_user(username):
         conn.rollback()
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def save_file_record(user_id, filename, file_path, file_type, mime_type, gemini_file_id=None):
-    """Save a record of an uploaded file to the user's data"""
-    conn = get_db_connection()
+    """Save a record of an uploaded file for the user"""
+    return save_file_records(user_id, [{
+        'filename': filename,
+        'file_path': file_path,
+        'file_type': file_type,
+        'mime_type': mime_type,
+        'gemini_file_id': gemini_file_id
+    }])[0]
+
+def save_file_records(user_id, records, conn=None):
+    """Save several uploaded file records for the user in one statement, returning their ids"""
+    if not records:
+        return []
+    # Inside transaction() the caller owns the connection, commit and rollback
+    own_conn = conn is None
+    if own_conn:
+        # Records spanning several INSERT pages are written in one transaction
+        conn = get_db_connection(autocommit=len(records) <= BULK_PAGE_SIZE)
     try:
         with conn.cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result:
-                # Create user if doesn't exist
-                user_data = {}
-            else:
-                user_data = result['data'] or {}
-
-            # Initialize files array if it doesn't exist
-            if 'files' not in user_data:
-                user_data['files'] = []
-
-            # Create file record
-            file_record = {
-                'id': len(user_data['files']) + 1,  # Simple ID generation
-                'filename': filename,
-                'file_path': file_path,
-                'file_type': file_type,
-                'mime_type': mime_type,
-                'gemini_file_id': gemini_file_id,
-                'upload_timestamp': datetime.now().isoformat()
-            }
-
-            user_data['files'].append(file_record)
-
-            # Update user data
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(user_data), user_id))
-
-            conn.commit()
-            return file_record['id']
+            # The ids and upload timestamps are assigned by the database
+            rows = psycopg2.extras.execute_values(cursor, '''
+            INSERT INTO files (user_id, filename, file_path, file_type, mime_type, gemini_file_id)
+            VALUES %s
+            RETURNING id
+            ''', [
+                (
+                    user_id,
+                    record['filename'],
+                    record['file_path'],
+                    record['file_type'],
+                    record['mime_type'],
+                    record.get('gemini_file_id')
+                )
+                for record in records
+            ], page_size=BULK_PAGE_SIZE, fetch=True)
+            if own_conn:
+                conn.commit()
+            return [row['id'] for row in rows]
     except psycopg2.Error as e:
-        print(f"Error in save_file_record: {e}")
-        conn.rollback()
+        print(f"Error in save_file_records: {e}")
+        if own_conn:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        if own_conn:
+            release_db_connection(conn)
 
-def get_user_files(user_id, file_type=None):
-    """Get all files uploaded by a user, optionally filtered by file type"""
+def get_user_files(user_id, file_type=None, limit=None):
+    """Get files uploaded by a user, newest first, optionally filtered by file type and limited in number"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
-                return []
-
-            user_data = result['data']
-            files = user_data.get('files', [])
-
-            if file_type:
-                files = [f for f in files if f.get('file_type') == file_type]
-
-            return files
+            _execute_prepared(cursor, 'get_user_files', (user_id, file_type or None, limit or None))
+            return [dict(row) for row in cursor.fetchall()]
     except psycopg2.Error as e:
         print(f"Error in get_user_files: {e}")
         raise
     finally:
-        conn.close()
-
-def save_cache_record(user_id, cache_name, display_name, jd_file_id, resume_file_id, ttl=1800):
-    """Save a record of a created Gemini cache to the user's data"""
-    conn = get_db_connection()
+        release_db_connection(conn)
+
+def save_cache_record(user_id, cache_name, display_name, jd_file_id, resume_file_id, ttl=1800, conn=None):
+    """Save a record of a created Gemini cache for the user"""
+    return save_cache_records_bulk(user_id, [{
+        'cache_name': cache_name,
+        'display_name': display_name,
+        'jd_file_id': jd_file_id,
+        'resume_file_id': resume_file_id,
+        'ttl': ttl
+    }], conn=conn)[0]
+
+def save_cache_records_bulk(user_id, records, conn=None):
+    """Save several cache records for the user in one statement, returning their ids"""
+    if not records:
+        return []
+    # Inside transaction() the caller owns the connection, commit and rollback
+    own_conn = conn is None
+    if own_conn:
+        # Records spanning several INSERT pages are written in one transaction
+        conn = get_db_connection(autocommit=len(records) <= BULK_PAGE_SIZE)
     try:
         with conn.cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result:
-                user_data = {}
-            else:
-                user_data = result['data'] or {}
-
-            # Initialize caches array if it doesn't exist
-            if 'caches' not in user_data:
-                user_data['caches'] = []
-
-            # Create cache record
-            cache_record = {
-                'id': len(user_data['caches']) + 1,  # Simple ID generation
-                'cache_name': cache_name,
-                'display_name': display_name,
-                'jd_file_id': jd_file_id,
-                'resume_file_id': resume_file_id,
-                'ttl': ttl,
-                'created_at': datetime.now().isoformat()
-            }
-
-            user_data['caches'].append(cache_record)
-
-            # Update user data
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(user_data), user_id))
-
-            conn.commit()
-            return cache_record['id']
+            # The ids and creation timestamps are assigned by the database
+            rows = psycopg2.extras.execute_values(cursor, '''
+            INSERT INTO caches (user_id, cache_name, display_name, jd_file_id, resume_file_id, ttl)
+            VALUES %s
+            RETURNING id
+            ''', [
+                (
+                    user_id,
+                    record['cache_name'],
+                    record['display_name'],
+                    record['jd_file_id'],
+                    record['resume_file_id'],
+                    record.get('ttl', 1800)
+                )
+                for record in records
+            ], page_size=BULK_PAGE_SIZE, fetch=True)
+            if own_conn:
+                conn.commit()
+            return [row['id'] for row in rows]
     except psycopg2.Error as e:
-        print(f"Error in save_cache_record: {e}")
-        conn.rollback()
+        print(f"Error in save_cache_records_bulk: {e}")
+        if own_conn:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        if own_conn:
+            release_db_connection(conn)
 
-def get_user_caches(user_id):
-    """Get all caches created by a user"""
+def get_user_caches(user_id, limit=None):
+    """Get caches created by a user, newest first, optionally limited in number"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
-                return []
-
-            user_data = result['data']
-            caches = user_data.get('caches', [])
-
-            # Enrich cache data with file information
-            files = user_data.get('files', [])
-            file_map = {f['id']: f for f in files}
-
-            for cache in caches:
-                if cache.get('jd_file_id') and cache['jd_file_id'] in file_map:
-                    cache['jd_filename'] = file_map[cache['jd_file_id']].get('filename')
-                if cache.get('resume_file_id') and cache['resume_file_id'] in file_map:
-                    cache['resume_filename'] = file_map[cache['resume_file_id']].get('filename')
-
-            return caches
+            _execute_prepared(cursor, 'get_user_caches', (user_id, limit or None))
+            return [dict(row) for row in cursor.fetchall()]
     except psycopg2.Error as e:
         print(f"Error in get_user_caches: {e}")
         raise
     finally:
-        conn.close()
-
-def save_analysis_result(user_id, cache_id, jd_file_id, resume_file_id, result_json):
-    """Save an analysis result to the user's data"""
-    conn = get_db_connection()
+        release_db_connection(conn)
+
+def save_analysis_result(user_id, cache_id, jd_file_id, resume_file_id, result, conn=None):
+    """Save an analysis result (a dict, or a JSON document as text) for the user"""
+    return save_analysis_results_bulk(user_id, [{
+        'cache_id': cache_id,
+        'jd_file_id': jd_file_id,
+        'resume_file_id': resume_file_id,
+        'result': result
+    }], conn=conn)[0]
+
+def save_analysis_results_bulk(user_id, records, conn=None):
+    """Save several analysis results (each record's result a dict or JSON text) for the user in one statement, returning their ids"""
+    if not records:
+        return []
+    # Inside transaction() the caller owns the connection, commit and rollback
+    own_conn = conn is None
+    if own_conn:
+        # Records spanning several INSERT pages are written in one transaction
+        conn = get_db_connection(autocommit=len(records) <= BULK_PAGE_SIZE)
     try:
         with conn.cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result:
-                user_data = {}
-            else:
-                user_data = result['data'] or {}
-
-            # Initialize analysis_results array if it doesn't exist
-            if 'analysis_results' not in user_data:
-                user_data['analysis_results'] = []
-
-            # Try to extract score and recommendation from JSON
-            score = None
-            recommendation = None
-
-            try:
-                result_data = json.loads(result_json)
-                if isinstance(result_data, dict):
-                    score = result_data.get('overall_fit_score')
-                    recommendation = result_data.get('recommendation')
-            except (json.JSONDecodeError, AttributeError):
-                pass
-
-            # Create analysis result record
-            analysis_record = {
-                'id': len(user_data['analysis_results']) + 1,  # Simple ID generation
-                'cache_id': cache_id,
-                'jd_file_id': jd_file_id,
-                'resume_file_id': resume_file_id,
-                'result_json': result_json,
-                'score': score,
-                'recommendation': recommendation,
-                'processed_at': datetime.now().isoformat()
-            }
-
-            user_data['analysis_results'].append(analysis_record)
-
-            # Update user data
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(user_data), user_id))
-
-            conn.commit()
-            return analysis_record['id']
+            # Dicts are sent through FastJson and JSON text as is; either way the
+            # result is parsed once, by the database, which also derives the
+            # generated score and recommendation columns. The ids and processing
+            # timestamps are assigned by the database too.
+            rows = psycopg2.extras.execute_values(cursor, '''
+            INSERT INTO analysis_results (user_id, cache_id, jd_file_id, resume_file_id, result_json)
+            VALUES %s
+            RETURNING id
+            ''', [
+                (user_id, record['cache_id'], record['jd_file_id'], record['resume_file_id'], record['result'])
+                for record in records
+            ], template='(%s, %s, %s, %s, %s::jsonb)', page_size=BULK_PAGE_SIZE, fetch=True)
+            if own_conn:
+                conn.commit()
+            return [row['id'] for row in rows]
     except psycopg2.Error as e:
-        print(f"Error in save_analysis_result: {e}")
-        conn.rollback()
+        print(f"Error in save_analysis_results_bulk: {e}")
+        if own_conn:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        if own_conn:
+            release_db_connection(conn)
 
 def get_user_analysis_results(user_id, limit=None):
     """Get analysis results for a user, optionally limited to a number of recent results"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
-                return []
-
-            user_data = result['data']
-            analysis_results = user_data.get('analysis_results', [])
-
-            # Sort by processed_at in descending order
-            analysis_results.sort(key=lambda x: x.get('processed_at', ''), reverse=True)
-
-            if limit:
-                analysis_results = analysis_results[:limit]
-
-            # Enrich with file information
-            files = user_data.get('files', [])
-            file_map = {f['id']: f for f in files}
-
-            for result in analysis_results:
-                if result.get('jd_file_id') and result['jd_file_id'] in file_map:
-                    result['jd_filename'] = file_map[result['jd_file_id']].get('filename')
-                if result.get('resume_file_id') and result['resume_file_id'] in file_map:
-                    result['resume_filename'] = file_map[result['resume_file_id']].get('filename')
-
-            return analysis_results
+            # Newest first
+            _execute_prepared(cursor, 'get_user_analysis_results', (user_id, limit or None))
+            return [dict(row) for row in cursor.fetchall()]
     except psycopg2.Error as e:
         print(f"Error in get_user_analysis_results: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def get_analysis_result_by_id(user_id, result_id):
     """Get a specific analysis result by ID for a user"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
+            _execute_prepared(cursor, 'get_analysis_result_by_id', (user_id, result_id))
+            row = cursor.fetchone()
+            if not row:
                 return None
 
-            user_data = result['data']
-            analysis_results = user_data.get('analysis_results', [])
-
-            # Find the specific result
-            for result in analysis_results:
-                if result.get('id') == result_id:
-                    # Enrich with file information
-                    files = user_data.get('files', [])
-                    file_map = {f['id']: f for f in files}
-
-                    if result.get('jd_file_id') and result['jd_file_id'] in file_map:
-                        result['jd_filename'] = file_map[result['jd_file_id']].get('filename')
-                    if result.get('resume_file_id') and result['resume_file_id'] in file_map:
-                        result['resume_filename'] = file_map[result['resume_file_id']].get('filename')
-
-                    result['username'] = user_id
-                    return result
-
-            return None
+            result = dict(row)
+            result['username'] = user_id
+            return result
     except psycopg2.Error as e:
         print(f"Error in get_analysis_result_by_id: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def save_batch_job(user_id, job_name, job_state, num_requests):
-    """Save a record of a batch job to the user's data"""
-    conn = get_db_connection()
+    """Save a record of a batch job for the user"""
+    return save_batch_jobs(user_id, [{
+        'job_name': job_name,
+        'job_state': job_state,
+        'num_requests': num_requests
+    }])[0]
+
+def save_batch_jobs(user_id, records, conn=None):
+    """Save several batch job records for the user in one statement, returning their ids"""
+    if not records:
+        return []
+    # Inside transaction() the caller owns the connection, commit and rollback
+    own_conn = conn is None
+    if own_conn:
+        # Records spanning several INSERT pages are written in one transaction
+        conn = get_db_connection(autocommit=len(records) <= BULK_PAGE_SIZE)
     try:
         with conn.cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result:
-                user_data = {}
-            else:
-                user_data = result['data'] or {}
-
-            # Initialize batch_jobs array if it doesn't exist
-            if 'batch_jobs' not in user_data:
-                user_data['batch_jobs'] = []
-
-            # Create batch job record
-            batch_job_record = {
-                'id': len(user_data['batch_jobs']) + 1,  # Simple ID generation
-                'job_name': job_name,
-                'job_state': job_state,
-                'num_requests': num_requests,
-                'created_at': datetime.now().isoformat(),
-                'completed_at': None
-            }
-
-            user_data['batch_jobs'].append(batch_job_record)
-
-            # Update user data
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(user_data), user_id))
-
-            conn.commit()
-            return batch_job_record['id']
+            # The ids and creation timestamps are assigned by the database
+            rows = psycopg2.extras.execute_values(cursor, '''
+            INSERT INTO batch_jobs (user_id, job_name, job_state, num_requests)
+            VALUES %s
+            RETURNING id
+            ''', [
+                (user_id, record['job_name'], record['job_state'], record['num_requests'])
+                for record in records
+            ], page_size=BULK_PAGE_SIZE, fetch=True)
+            if own_conn:
+                conn.commit()
+            return [row['id'] for row in rows]
     except psycopg2.Error as e:
-        print(f"Error in save_batch_job: {e}")
-        conn.rollback()
+        print(f"Error in save_batch_jobs: {e}")
+        if own_conn:
+            conn.rollback()
         raise
     finally:
-        conn.close()
+        if own_conn:
+            release_db_connection(conn)
 
 def update_batch_job_status(user_id, job_id, job_state, completed_at=None):
     """Update the status of a batch job for a user"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
-                return
-
-            user_data = result['data']
-            batch_jobs = user_data.get('batch_jobs', [])
-
-            # Find and update the batch job
-            for job in batch_jobs:
-                if job.get('id') == job_id:
-                    job['job_state'] = job_state
-                    if completed_at is None and job_state in ['JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED']:
-                        job['completed_at'] = datetime.now().isoformat()
-                    else:
-                        job['completed_at'] = completed_at
-                    break
-
-            # Update user data
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(user_data), user_id))
+            _execute_prepared(cursor, 'update_batch_job_status', (job_state, completed_at, user_id, job_id))
 
             conn.commit()
     except psycopg2.Error as e:
@@ -463,66 +692,106 @@ def update_batch_job_status(user_id, job_id, job_state, completed_at=None):
         conn.rollback()
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def get_user_batch_jobs(user_id):
-    """Get all batch jobs for a user"""
+def get_user_batch_jobs(user_id, limit=None):
+    """Get batch jobs for a user, newest first, optionally limited in number"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT data FROM user_data WHERE user_id = %s', (user_id,))
-            result = cursor.fetchone()
-
-            if not result or not result['data']:
-                return []
-
-            user_data = result['data']
-            batch_jobs = user_data.get('batch_jobs', [])
-
-            # Sort by created_at in descending order
-            batch_jobs.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-
-            return batch_jobs
+            _execute_prepared(cursor, 'get_user_batch_jobs', (user_id, limit or None))
+            return [dict(row) for row in cursor.fetchall()]
     except psycopg2.Error as e:
         print(f"Error in get_user_batch_jobs: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+_user_data_cache = OrderedDict()
+_user_data_cache_lock = threading.Lock()
+
+def invalidate_user_data(user_id):
+    """Drop a user's cached get_user_data row"""
+    with _user_data_cache_lock:
+        _user_data_cache.pop(user_id, None)
 
 def get_user_data(user_id):
     """Get all data for a specific user"""
+    with _user_data_cache_lock:
+        entry = _user_data_cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            _user_data_cache.move_to_end(user_id)
+            # Callers may modify the returned data; keep the cached row intact
+            return copy.deepcopy(entry[1])
+
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('SELECT user_id, data, created_at, updated_at FROM user_data WHERE user_id = %s', (user_id,))
+            _execute_prepared(cursor, 'get_user_data', (user_id,))
             result = cursor.fetchone()
 
             if result:
-                return dict(result)
+                result = dict(result)
+                with _user_data_cache_lock:
+                    _user_data_cache[user_id] = (time.monotonic() + USER_DATA_CACHE_TTL, copy.deepcopy(result))
+                    _user_data_cache.move_to_end(user_id)
+                    while len(_user_data_cache) > USER_DATA_CACHE_SIZE:
+                        _user_data_cache.popitem(last=False)
+                return result
             return None
     except psycopg2.Error as e:
         print(f"Error in get_user_data: {e}")
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def update_user_data(user_id, data):
     """Update the data for a specific user"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute('''
-            UPDATE user_data
-            SET data = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = %s
-            ''', (psycopg2.extras.Json(data), user_id))
+            _execute_prepared(cursor, 'update_user_data', (FastJson(data), user_id))
             conn.commit()
+        invalidate_user_data(user_id)
     except psycopg2.Error as e:
         print(f"Error in update_user_data: {e}")
         conn.rollback()
         raise
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def get_cached_analyses(cache_keys):
+    """Get cached analysis results younger than ANALYSIS_CACHE_TTL_DAYS, as a {cache_key: result_json} dict"""
+    if not cache_keys:
+        return {}
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            _execute_prepared(cursor, 'get_cached_analyses', (list(cache_keys), ANALYSIS_CACHE_TTL_DAYS))
+            return {row['cache_key']: row['result_json'] for row in cursor.fetchall()}
+    except psycopg2.Error as e:
+        print(f"Error in get_cached_analyses: {e}")
+        raise
+    finally:
+        release_db_connection(conn)
 
-# Initialize the database when this module is imported
-init_db()
\ No newline at end of file
+def save_cached_analyses(entries):
+    """Store analysis results in the cache from a {cache_key: result_json} dict, refreshing existing entries"""
+    if not entries:
+        return
+    conn = get_db_connection(autocommit=len(entries) <= BULK_PAGE_SIZE)
+    try:
+        with conn.cursor() as cursor:
+            psycopg2.extras.execute_values(cursor, '''
+            INSERT INTO analysis_cache (cache_key, result_json)
+            VALUES %s
+            ON CONFLICT (cache_key) DO UPDATE
+            SET result_json = EXCLUDED.result_json, created_at = CURRENT_TIMESTAMP
+            ''', list(entries.items()), page_size=BULK_PAGE_SIZE)
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error in save_cached_analyses: {e}")
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
\ No newline at end of file
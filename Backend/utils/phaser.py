@@ -4,6 +4,39 @@ import logging
 import sys
 import tempfile
 import shutil
+import threading
+import mimetypes
+from pathlib import Path
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # PDFs then go through the docling CLI
+    fitz = None
+try:
+    from docx import Document
+except ImportError:  # DOCX files then go through the docling CLI
+    Document = None
+
+# PDFs with at least this many pages are split into page ranges extracted in
+# parallel; below it the process start-up costs more than it saves
+PDF_PARALLEL_MIN_PAGES = 32
+
+# Where the docling CLI writes its output; a RAM-backed tmpfs on Linux
+DOCLING_OUTPUT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+_converter = None
+_converter_lock = threading.Lock()
+
+def _get_converter():
+    """Return the process-wide DocumentConverter, so docling's models load only once"""
+    global _converter
+    if _converter is None:
+        # Threads extracting at once on first use must not each load the models
+        with _converter_lock:
+            if _converter is None:
+                _converter = DocumentConverter()
+    return _converter
 
 def extract_document(file_path, output_path="extract.txt", disable_symlinks_warning=True, use_simple_extraction=False):
     """
@@ -34,48 +67,45 @@ def extract_document(file_path, output_path="extract.txt", disable_symlinks_warn
     if disable_symlinks_warning:
         os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
     
+    # Check if the file exists
+    if not os.path.exists(file_path):
+        logging.error(f"File not found: {file_path}")
+        return False
+    
+    if use_simple_extraction:
+        # Simpler approach for Windows environments without symlink privileges
+        return _save_simple_extraction(file_path, output_path)
+    
     try:
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            logging.error(f"File not found: {file_path}")
-            return False
+        # Standard approach using docling's full capabilities
+        # Reuse the document converter and its loaded models
+        converter = _get_converter()
         
-        if use_simple_extraction:
-            # Simpler approach for Windows environments without symlink privileges
-            text = _extract_document_simple(file_path)
-            
-            # Save the extracted text to the output file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(text)
-                
-            logging.info(f"Document extracted using simple method and saved to {output_path}")
-            return True
-        else:
-            # Standard approach using docling's full capabilities
-            # Initialize the document converter
-            converter = DocumentConverter()
-            
-            # Extract text from the document
-            result = converter.convert(file_path)
-            
-            # Export the document to markdown text
-            text = result.document.export_to_markdown()
-            
-            # Save the extracted text to the output file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(text)
-            
-            logging.info(f"Document extracted successfully and saved to {output_path}")
-            return True
+        # Extract text from the document
+        result = converter.convert(file_path)
+        
+        # Export the document to markdown text and save it to the output file
+        Path(output_path).write_text(result.document.export_to_markdown(), encoding='utf-8')
+        
+        logging.info(f"Document extracted successfully and saved to {output_path}")
+        return True
     
     except Exception as e:
         logging.error(f"Error extracting document: {str(e)}")
         
         # If standard extraction fails, try the simple approach as fallback
-        if not use_simple_extraction:
-            logging.info("Attempting fallback to simple extraction method...")
-            return extract_document(file_path, output_path, disable_symlinks_warning, True)
-        
+        logging.info("Attempting fallback to simple extraction method...")
+        return _save_simple_extraction(file_path, output_path)
+
+def _save_simple_extraction(file_path, output_path):
+    """Extract a document with _extract_document_simple and save the text, returning whether it succeeded."""
+    try:
+        text = _extract_document_simple(file_path)
+        Path(output_path).write_text(text, encoding='utf-8')
+        logging.info(f"Document extracted using simple method and saved to {output_path}")
+        return True
+    except Exception as e:
+        logging.error(f"Error extracting document: {str(e)}")
         return False
 
 def _extract_document_simple(file_path):
@@ -93,100 +123,103 @@ def _extract_document_simple(file_path):
     str
         Extracted text content
     """
-    import mimetypes
-    file_type = mimetypes.guess_type(file_path)[0]
-    
-    text = ""
-    
-    # Handle PDF files
-    if file_type == 'application/pdf':
-        try:
-            import fitz  # PyMuPDF
-            doc = fitz.open(file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-            doc.close()
-        except ImportError:
-            logging.warning("PyMuPDF not available, falling back to docling CLI")
-            text = _try_docling_cli(file_path)
-    
-    # Handle DOCX files
-    elif file_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-        try:
-            from docx import Document
-            doc = Document(file_path)
-            
-            # Extract text from paragraphs
-            paragraphs = []
-            for para in doc.paragraphs:
-                if para.text.strip():  # Skip empty paragraphs
-                    paragraphs.append(para.text)
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():  # Skip empty cells
-                            row_text.append(cell.text.strip())
-                    if row_text:  # Skip empty rows
-                        paragraphs.append(" | ".join(row_text))
-            
-            # Join all extracted text
-            text = "\n\n".join(paragraphs)
-        except ImportError:
-            logging.warning("python-docx not available, falling back to docling CLI")
-            text = _try_docling_cli(file_path)
-        except Exception as e:
-            logging.warning(f"Error extracting text from DOCX using python-docx: {str(e)}")
-            logging.warning("Falling back to docling CLI")
-            text = _try_docling_cli(file_path)
-    
-    # Handle TXT files
-    elif file_type == 'text/plain':
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
-    
-    # For other file types or if type detection failed, try docling CLI
-    else:
-        text = _try_docling_cli(file_path)
-    
-    return text
+    # Pick the extractor for the file's MIME type; unknown types and failed
+    # type detection go to the docling CLI
+    extractor = _EXTRACTORS.get(mimetypes.guess_type(file_path)[0], _try_docling_cli)
+    return extractor(file_path)
+
+def _extract_pdf(file_path):
+    """Extract the plain text of a PDF, splitting large ones across worker processes."""
+    if fitz is None:
+        logging.warning("PyMuPDF not available, falling back to docling CLI")
+        return _try_docling_cli(file_path)
+
+    with fitz.open(file_path) as doc:
+        page_count = len(doc)
+    workers = min(os.cpu_count() or 1, page_count // PDF_PARALLEL_MIN_PAGES)
+    if workers > 1:
+        # A PyMuPDF document must not be shared between threads, so
+        # each worker process opens the file and reads its own pages
+        bounds = [page_count * i // workers for i in range(workers + 1)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return "".join(executor.map(_extract_pdf_pages, [file_path] * workers, bounds[:-1], bounds[1:]))
+    return _extract_pdf_pages(file_path, 0, page_count)
+
+def _extract_docx(file_path):
+    """Extract the paragraphs and table rows of a DOCX file."""
+    if Document is None:
+        logging.warning("python-docx not available, falling back to docling CLI")
+        return _try_docling_cli(file_path)
+
+    try:
+        doc = Document(file_path)
+        
+        # Extract text from paragraphs
+        paragraphs = []
+        for para in doc.paragraphs:
+            if para.text.strip():  # Skip empty paragraphs
+                paragraphs.append(para.text)
+        
+        # Extract text from tables
+        for table in doc.tables:
+            for row in table.rows:
+                row_text = []
+                for cell in row.cells:
+                    if cell.text.strip():  # Skip empty cells
+                        row_text.append(cell.text.strip())
+                if row_text:  # Skip empty rows
+                    paragraphs.append(" | ".join(row_text))
+        
+        # Join all extracted text
+        return "\n\n".join(paragraphs)
+    except Exception as e:
+        logging.warning(f"Error extracting text from DOCX using python-docx: {str(e)}")
+        logging.warning("Falling back to docling CLI")
+        return _try_docling_cli(file_path)
+
+def _extract_txt(file_path):
+    """Read a plain text file."""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def _extract_pdf_pages(file_path, start, stop):
+    """Extract the plain text of pages [start, stop) of a PDF."""
+    with fitz.open(file_path) as doc:
+        return "".join([doc.load_page(page_num).get_text("text") for page_num in range(start, stop)])
 
 def _try_docling_cli(file_path):
     """Try to use the docling CLI to extract text."""
-    import subprocess
-    import tempfile
-    
-    temp_output = tempfile.NamedTemporaryFile(delete=False, suffix='.md')
-    temp_output.close()
-    
     try:
-        result = subprocess.run(
-            ["docling", file_path, "--output", temp_output.name],
-            capture_output=True, 
-            text=True, 
-            check=False
-        )
-        
-        if result.returncode == 0:
-            with open(temp_output.name, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            logging.error(f"docling CLI failed: {result.stderr}")
-            return f"[Failed to extract content]\nError: {result.stderr}"
+        # docling writes <name>.md into an output directory rather than to
+        # stdout; keep that directory in RAM when /dev/shm is available
+        with tempfile.TemporaryDirectory(dir=DOCLING_OUTPUT_DIR) as output_dir:
+            result = subprocess.run(
+                ["docling", file_path, "--to", "md", "--output", output_dir],
+                capture_output=True, 
+                text=True, 
+                check=False
+            )
+            
+            if result.returncode == 0:
+                output_file = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0] + ".md")
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    return f.read()
+            else:
+                logging.error(f"docling CLI failed: {result.stderr}")
+                return f"[Failed to extract content]\nError: {result.stderr}"
     except Exception as e:
         logging.error(f"Error using docling CLI: {str(e)}")
         return f"[Failed to extract content]\nError: {str(e)}"
-    finally:
-        # Clean up temp file
-        try:
-            os.unlink(temp_output.name)
-        except:
-            pass
     
 
+# Extractors used by _extract_document_simple, keyed by MIME type
+_EXTRACTORS = {
+    'application/pdf': _extract_pdf,
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': _extract_docx,
+    'text/plain': _extract_txt,
+}
+
+
 if __name__ == "__main__":
     # Configure logging
     logging.basicConfig(
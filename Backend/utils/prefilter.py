@@ -0,0 +1,192 @@
+"""
+Keyword prefilter that rejects resumes before they reach Gemini.
+
+Required skills are found with one Aho-Corasick automaton per skills list,
+scanning each resume once for all of them (one regex per skill is used when
+pyahocorasick isn't installed).
+
+A resume that mentions fewer than PREFILTER_MIN_COVERAGE of the job's required
+skills gets a locally synthesized NO_FIT analysis instead of an LLM call. Skills
+missing verbatim are also matched against near-spellings ("ReactJS" for "React")
+with the Sift4 distance, which only ever sends more resumes on to Gemini.
+
+Usage:
+    from utils.prefilter import document_text, prefilter
+    analysis = prefilter(document_text("resume.pdf"), ["Python", "SQL", "Docker"])
+    if analysis is None:
+        ...  # worth a full analysis
+"""
+
+import functools
+import io
+import os
+import re
+from pathlib import Path
+from utils.sift4 import sift4
+try:
+    import ahocorasick
+except ImportError:  # skills are then found with one regex per skill
+    ahocorasick = None
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # PDF resumes are then never prefiltered
+    fitz = None
+try:
+    from docx import Document
+except ImportError:  # DOCX resumes are then never prefiltered
+    Document = None
+
+# Fraction of the required skills a resume must mention to be sent to Gemini
+PREFILTER_MIN_COVERAGE = float(os.getenv("PREFILTER_MIN_COVERAGE", "0.3"))
+
+# Single-word skills at least this long are also matched fuzzily; shorter ones
+# ("Go", "SQL", "C++") are within a couple of edits of too many unrelated words
+FUZZY_MIN_LENGTH = 4
+
+# Words of a resume, and the characters kept when comparing them to skills
+_WORD_RE = re.compile(r"[\w+#.]+")
+_NON_SKILL_CHARS = re.compile(r"[^0-9a-z+#]")
+
+
+def parse_skills(skills):
+    """Split a comma-separated skills string into a tuple of distinct skills, keeping their order"""
+    return tuple(dict.fromkeys(skill.strip() for skill in (skills or "").split(",") if skill.strip()))
+
+
+@functools.lru_cache(maxsize=64)
+def _skill_patterns(skill_keys):
+    """Case-insensitive regex per skill, matching it as a whole word"""
+    # One pattern per skill rather than an alternation, so overlapping skills
+    # ("React" inside "React Native") are all found, as with the automaton;
+    # lookarounds instead of \b keep skills such as "C++" and ".NET" that start
+    # or end with punctuation
+    return [(key, re.compile(rf"(?<!\w){re.escape(key)}(?!\w)", re.IGNORECASE)) for key in skill_keys]
+
+
+@functools.lru_cache(maxsize=64)
+def _skills_automaton(skill_keys):
+    """Aho-Corasick automaton finding every (casefolded) skill in one pass over a casefolded text"""
+    automaton = ahocorasick.Automaton()
+    for key in skill_keys:
+        automaton.add_word(key, key)
+    automaton.make_automaton()
+    return automaton
+
+
+def _is_word_char(char):
+    """Whether char would match the regex \\w"""
+    return char.isalnum() or char == "_"
+
+
+def _exact_matches(skill_keys, resume_text):
+    """The skills (by casefolded key) the resume mentions as whole words"""
+    if ahocorasick is None:
+        return {key for key, pattern in _skill_patterns(skill_keys) if pattern.search(resume_text)}
+    text = resume_text.casefold()
+    last = len(text) - 1
+    found = set()
+    # The automaton reports substrings; keep those not inside a longer word
+    for end, key in _skills_automaton(skill_keys).iter(text):
+        start = end - len(key) + 1
+        if (start == 0 or not _is_word_char(text[start - 1])) and (end == last or not _is_word_char(text[end + 1])):
+            found.add(key)
+    return found
+
+
+def _normalize(text):
+    """Lowercase letters, digits, + and # of a skill or word, e.g. "React.js" -> "reactjs" """
+    return _NON_SKILL_CHARS.sub("", text.casefold())
+
+
+def _fuzzy_matches(skill_keys, resume_text):
+    """The skills (by key) that some resume word is within a couple of Sift4 edits of"""
+    words = {_normalize(word) for word in _WORD_RE.findall(resume_text)}
+    matched = set()
+    for key in skill_keys:
+        target = _normalize(key)
+        if " " in key or len(target) < FUZZY_MIN_LENGTH:
+            continue
+        max_distance = 1 if len(target) == FUZZY_MIN_LENGTH else 2
+        # The length check rules most words out before the distance is computed
+        if any(abs(len(word) - len(target)) <= max_distance and sift4(target, word, 5) <= max_distance
+               for word in words):
+            matched.add(key)
+    return matched
+
+
+def document_text(file_path, data=None):
+    """Plain text of a PDF, DOCX or text resume, read from data when given instead of the file"""
+    ext = Path(file_path).suffix.lower()
+    if ext == ".pdf":
+        if fitz is None:
+            raise ImportError("PyMuPDF is required to read PDF files")
+        with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(file_path)) as doc:
+            return "".join([page.get_text("text") for page in doc])
+    if ext == ".docx":
+        if Document is None:
+            raise ImportError("python-docx is required to read DOCX files")
+        doc = Document(io.BytesIO(data) if data is not None else file_path)
+        return "\n".join([p.text for p in doc.paragraphs])
+    if data is not None:
+        return data.decode("utf-8", errors="ignore")
+    return Path(file_path).read_text(encoding="utf-8", errors="ignore")
+
+
+def prefilter(resume_text, required_skills, min_coverage=PREFILTER_MIN_COVERAGE):
+    """
+    Reject a resume that mentions too few of the required skills.
+
+    Args:
+        resume_text (str): Plain text of the resume
+        required_skills (iterable): The job's required skills
+        min_coverage (float): Fraction of the required skills the resume must mention
+
+    Returns:
+        dict: A NO_FIT analysis in the ATS schema if the resume is rejected, else None
+    """
+    # A resume without a text layer (e.g. a scan) can't be judged by keywords
+    if not resume_text.strip():
+        return None
+    skills = {skill.casefold(): skill for skill in required_skills}
+    if not skills:
+        return None
+
+    found = _exact_matches(tuple(skills), resume_text)
+    if len(found) / len(skills) < min_coverage:
+        found |= _fuzzy_matches(skills.keys() - found, resume_text)
+    coverage = len(found) / len(skills)
+    if coverage >= min_coverage:
+        return None
+
+    score = round(coverage * 100)
+    missing = [skill for key, skill in skills.items() if key not in found]
+    return {
+        "candidate_name": "",
+        "position_applied": "",
+        "company": "",
+        "overall_fit_score": score,
+        "recommendation": "REJECTED",
+        "fit_level": "NO_FIT",
+        "key_strengths": [f"Mentions {skills[key]}" for key in skills if key in found],
+        "major_concerns": [f"Mentions only {len(found)} of {len(skills)} required skills"],
+        "skills_assessment": {
+            "required_skills_match": score,
+            "preferred_skills_match": 0,
+            "critical_skills_missing": missing,
+            "skill_gaps_impact": "Critical"
+        },
+        "experience_fit": {
+            "years_required": 0,
+            "years_candidate_has": 0,
+            "experience_relevance": "None",
+            "project_quality": "Poor"
+        },
+        "hiring_decision_factors": {
+            "technical_competency": score,
+            "experience_level": 0,
+            "cultural_fit_indicators": 0,
+            "growth_potential": 0,
+            "immediate_productivity": 0
+        },
+        "prefiltered": True
+    }
@@ -0,0 +1,87 @@
+"""
+Sift4 string distance, a fast approximation of the Levenshtein distance.
+
+It walks both strings once, looking at most max_offset characters ahead to
+resynchronize after a mismatch, so a comparison costs O(n) rather than the
+O(n * m) of the edit-distance table. Accurate for short strings such as skill
+names, which is where the prefilter uses it.
+
+Usage:
+    from utils.sift4 import sift4
+    sift4("react", "reactjs")  # 2
+"""
+
+
+def sift4(s1, s2, max_offset=5):
+    """
+    Approximate edit distance between two strings (the common Sift4 variant).
+
+    Args:
+        s1 (str): First string
+        s2 (str): Second string
+        max_offset (int): How far ahead to search for a matching character after a mismatch
+
+    Returns:
+        int: The approximate number of edits turning s1 into s2
+    """
+    l1, l2 = len(s1), len(s2)
+    if not l1:
+        return l2
+    if not l2:
+        return l1
+
+    c1 = c2 = 0  # cursors into s1 and s2
+    lcss = 0  # largest common subsequence
+    local_cs = 0  # length of the current common substring
+    trans = 0  # transpositions
+    offsets = []  # [c1, c2, is_transposition] of earlier matches
+
+    while c1 < l1 and c2 < l2:
+        if s1[c1] == s2[c2]:
+            local_cs += 1
+            is_trans = False
+            # Count a transposition if this match crosses an earlier one
+            i = 0
+            while i < len(offsets):
+                ofs = offsets[i]
+                if c1 <= ofs[0] or c2 <= ofs[1]:
+                    is_trans = abs(c2 - c1) >= abs(ofs[1] - ofs[0])
+                    if is_trans:
+                        trans += 1
+                    elif not ofs[2]:
+                        ofs[2] = True
+                        trans += 1
+                    break
+                if c1 > ofs[1] and c2 > ofs[0]:
+                    del offsets[i]
+                else:
+                    i += 1
+            offsets.append([c1, c2, is_trans])
+        else:
+            lcss += local_cs
+            local_cs = 0
+            if c1 != c2:
+                c1 = c2 = min(c1, c2)
+            # Look ahead in either string for the character the other is at
+            for i in range(max_offset):
+                if c1 + i >= l1 and c2 + i >= l2:
+                    break
+                if c1 + i < l1 and s1[c1 + i] == s2[c2]:
+                    c1 += i - 1
+                    c2 -= 1
+                    break
+                if c2 + i < l2 and s1[c1] == s2[c2 + i]:
+                    c1 -= 1
+                    c2 += i - 1
+                    break
+
+        c1 += 1
+        c2 += 1
+        # Reached the end of one string: close the current substring and realign
+        if c1 >= l1 or c2 >= l2:
+            lcss += local_cs
+            local_cs = 0
+            c1 = c2 = min(c1, c2)
+
+    lcss += local_cs
+    return max(l1, l2) - lcss + trans
@@ -1,43 +1,27 @@
 import streamlit as st
 import requests
 import uuid
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from models import decode_result, decode_results
+from render import inject_styles, render_result, render_results_table, results_frame
 
 API_URL = "https://08b745788978.ngrok-free.app/"  # Replace with your FastAPI backend
 
+
+@st.cache_resource
+def get_session():
+    """One keep-alive HTTP session per server process, shared across reruns and users"""
+    # Reusing connections skips a TCP and TLS handshake to the tunnel per request
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 # --- Streamlit Page Config ---
 st.set_page_config(page_title="ATS Resume Scoring", layout="wide")
-st.markdown("""
-    <style>
-    .stButton>button {
-        background-color: #1f77b4;
-        color: white;
-        height:3em;
-        width:100%;
-        font-size:16px;
-        border-radius:8px;
-    }
-    .stProgress>div>div>div>div {
-        background-color: #1f77b4;
-    }
-    .skill-bar {
-        height: 25px;
-        border-radius: 12px;
-        margin-bottom: 8px;
-        background-color: #e0e0e0;
-        overflow: hidden;
-    }
-    .skill-fill {
-        height: 100%;
-        border-radius: 12px;
-        text-align: right;
-        padding-right: 10px;
-        color: white;
-        font-weight: bold;
-        line-height: 25px;
-    }
-    </style>
-""", unsafe_allow_html=True)
+inject_styles()
 
 st.title("ATS Resume Scoring System")
 
@@ -46,108 +30,121 @@ if "user_uuid" not in st.session_state:
     st.session_state.user_uuid = str(uuid.uuid4())
 st.markdown(f"**Session UUID:** `{st.session_state.user_uuid}`")
 
-# --- Upload Job Description ---
-jd_file = st.file_uploader("Upload Job Description (PDF/DOCX)", type=["pdf", "docx"])
-
-# --- Single vs Bulk Resume Upload ---
-upload_mode = st.radio("Select Upload Mode:", ["Single Resume", "Bulk Resumes (ZIP)"], horizontal=True)
-
-if upload_mode == "Single Resume":
-    resume_file = st.file_uploader("Upload Resume (PDF/DOCX)", type=["pdf", "docx"], key="single")
-else:
-    resumes_zip = st.file_uploader("Upload Resumes ZIP", type=["zip"], key="bulk")
-
-# --- Analyze Button ---
-if st.button("Analyze"):
-    if not jd_file:
-        st.error("Please upload the Job Description.")
-    elif upload_mode == "Single Resume" and not resume_file:
-        st.error("Please upload a Resume file.")
-    elif upload_mode == "Bulk Resumes (ZIP)" and not resumes_zip:
-        st.error("Please upload a ZIP of Resumes.")
+
+@st.fragment
+def results_section():
+    """The latest analysis results, redrawn from session state without re-posting"""
+    results = st.session_state.get("results")
+    if results is None:
+        return
+    st.success(f"✅ Analysis completed: {len(results)} resume(s) processed")
+    if st.session_state.results_mode == "bulk":
+        # Selecting a row reruns only this fragment
+        render_results_table(results, key=f"bulk_results_{st.session_state.results_batch}")
     else:
-        files = {"jd": (jd_file.name, jd_file, jd_file.type)}
-        endpoint = ""
-        if upload_mode == "Single Resume":
-            files["resume"] = (resume_file.name, resume_file, resume_file.type)
-            endpoint = "/upload/"
-        else:
-            files["resumes_zip"] = (resumes_zip.name, resumes_zip, resumes_zip.type)
-            endpoint = "/bulk-upload/"
-
-        data = {"user_uuid": st.session_state.user_uuid}
-
-        with st.spinner("Analyzing resumes..."):
-            response = requests.post(f"{API_URL}{endpoint}", files=files, data=data)
-
-        if response.status_code == 200:
-            results = response.json().get("analysis_results") or response.json().get("analyses")
-            st.success(f"✅ Analysis completed: {len(results)} resume(s) processed")
-
-            for res in results:
-                analysis = res.get("analysis") if "analysis" in res else res
-                resume_name = res.get("resume_file") if "resume_file" in res else "Single Resume"
-
-                st.markdown(f"## {resume_name}")
-
-                # --- Fit Score ---
-                fit_score = analysis.get("overall_fit_score", 0)
-                fit_level = analysis.get("fit_level", "NO_FIT")
-                color = "green" if fit_level == "HIGH_FIT" else "orange" if fit_level == "MEDIUM_FIT" else "red"
-                st.markdown(f"**Fit Level:** <span style='color:{color}; font-weight:bold'>{fit_level}</span>",
-                            unsafe_allow_html=True)
-                st.progress(fit_score / 100.0)
-                st.markdown(f"**Recommendation:** {analysis.get('recommendation')}")
-
-                # --- Key Strengths & Concerns ---
-                with st.expander("Key Strengths"):
-                    for s in analysis.get("key_strengths", []):
-                        st.markdown(f"- {s}")
-                with st.expander("Major Concerns"):
-                    for c in analysis.get("major_concerns", []):
-                        st.markdown(f"- {c}")
-
-                # --- Skills Assessment (Progress Bars) ---
-                st.markdown("### Skills Assessment")
-                skills = analysis.get("skills_assessment", {})
-                for skill_type, value in [("Required Skills Match", skills.get("required_skills_match", 0)),
-                                          ("Preferred Skills Match", skills.get("preferred_skills_match", 0))]:
-                    st.markdown(f"**{skill_type}: {value}%**")
-                    st.markdown(f"""
-                        <div class="skill-bar">
-                            <div class="skill-fill" style="width:{value}%; background-color:#1f77b4">{value}%</div>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-                if skills.get("critical_skills_missing"):
-                    st.markdown(f"- Missing Critical Skills: {', '.join(skills.get('critical_skills_missing'))}")
-
-                # --- Experience Fit (Progress Bars) ---
-                st.markdown("### Experience Fit")
-                exp = analysis.get("experience_fit", {})
-                years_required = exp.get("years_required", 0)
-                years_candidate = exp.get("years_candidate_has", 0)
-                exp_percent = min(100, int((years_candidate / max(1, years_required)) * 100))
-                st.markdown(f"**Experience Fit: {exp_percent}%**")
-                st.markdown(f"""
-                    <div class="skill-bar">
-                        <div class="skill-fill" style="width:{exp_percent}%; background-color:#ff7f0e">{exp_percent}%</div>
-                    </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"- Experience Relevance: {exp.get('experience_relevance', '')}")
-                st.markdown(f"- Project Quality: {exp.get('project_quality', '')}")
-
-                # --- Hiring Decision Factors ---
-                factors = analysis.get("hiring_decision_factors", {})
-                if factors:
-                    st.markdown("### Hiring Decision Factors")
-                    for factor, score in factors.items():
-                        st.markdown(f"**{factor}: {score}%**")
-                        st.markdown(f"""
-                            <div class="skill-bar">
-                                <div class="skill-fill" style="width:{score}%; background-color:#2ca02c">{score}%</div>
-                            </div>
-                        """, unsafe_allow_html=True)
+        for res in results:
+            render_result(res)
+
+
+def show_results(results, mode):
+    """Keep a finished analysis in session state for results_section"""
+    st.session_state.results = results
+    st.session_state.results_mode = mode
+    # A new table key per batch, so no row selection carries over
+    st.session_state.results_batch = st.session_state.get("results_batch", 0) + 1
 
+
+@st.fragment
+def upload_section():
+    """Uploads and the Analyze button; interacting with them reruns only this fragment"""
+    # --- Upload Job Description ---
+    jd_file = st.file_uploader("Upload Job Description (PDF/DOCX)", type=["pdf", "docx"])
+
+    # Read the JD once per uploaded file; every request then sends these bytes
+    # rather than the upload stream, which a previous request may have consumed
+    if jd_file and st.session_state.get("jd_id") != jd_file.file_id:
+        st.session_state.jd_bytes = jd_file.getvalue()
+        st.session_state.jd_id = jd_file.file_id
+
+    # --- Optional Required Skills ---
+    # Resumes mentioning too few of these are rejected by the backend without an LLM call
+    required_skills = st.text_input("Required skills (comma-separated, optional)", placeholder="Python, SQL, Docker")
+
+    # --- Single vs Bulk Resume Upload ---
+    upload_mode = st.radio("Select Upload Mode:", ["Single Resume", "Bulk Resumes (ZIP)"], horizontal=True)
+
+    if upload_mode == "Single Resume":
+        resume_file = st.file_uploader("Upload Resume (PDF/DOCX)", type=["pdf", "docx"], key="single")
+    else:
+        resumes_zip = st.file_uploader("Upload Resumes ZIP", type=["zip"], key="bulk")
+
+    # --- Analyze Button ---
+    if st.button("Analyze"):
+        if not jd_file:
+            st.error("Please upload the Job Description.")
+        elif upload_mode == "Single Resume" and not resume_file:
+            st.error("Please upload a Resume file.")
+        elif upload_mode == "Bulk Resumes (ZIP)" and not resumes_zip:
+            st.error("Please upload a ZIP of Resumes.")
+        elif upload_mode == "Single Resume":
+            files = {
+                "jd": (jd_file.name, st.session_state.jd_bytes, jd_file.type),
+                "resume": (resume_file.name, resume_file.getvalue(), resume_file.type),
+            }
+            data = {"user_uuid": st.session_state.user_uuid, "required_skills": required_skills}
+
+            try:
+                with st.spinner("Analyzing resumes..."):
+                    response = get_session().post(f"{API_URL}/upload/", files=files, data=data)
+            except requests.RequestException as e:
+                st.error(f"Could not reach the backend: {e}")
+            else:
+                if response.status_code == 200:
+                    show_results(decode_results(response.content), "single")
+                else:
+                    st.error(f"Error: {response.status_code} - {response.text}")
         else:
-            st.error(f"Error: {response.status_code} - {response.text}")
+            # Send the whole ZIP once and list each resume's analysis as the
+            # backend streams it back, one JSON line per resume
+            files = {
+                "jd": (jd_file.name, st.session_state.jd_bytes, jd_file.type),
+                "resumes_zip": (resumes_zip.name, resumes_zip.getvalue(), resumes_zip.type),
+            }
+            data = {"user_uuid": st.session_state.user_uuid, "required_skills": required_skills}
+
+            # Drop the previous results while this batch runs
+            st.session_state.results = None
+            status = st.empty()
+            status.info("Analyzing resumes...")
+            live_table = st.empty()
+            results = []
+            try:
+                with get_session().post(
+                    f"{API_URL}/bulk-upload/",
+                    files=files,
+                    data=data,
+                    headers={"Accept": "application/x-ndjson"},
+                    stream=True,
+                ) as response:
+                    if response.status_code == 200:
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            results.append(decode_result(line))
+                            live_table.dataframe(results_frame(results), hide_index=True)
+                            status.info(f"Analyzed {len(results)} resume(s)...")
+                        status.empty()
+                    else:
+                        status.error(f"Error: {response.status_code} - {response.text}")
+            except requests.RequestException as e:
+                status.error(f"Connection to the backend lost after {len(results)} resume(s): {e}")
+            # Replaced by results_section's selectable table, keeping whatever
+            # arrived before a dropped connection
+            live_table.empty()
+            if results:
+                show_results(results, "bulk")
+
+    results_section()
+
+
+upload_section()
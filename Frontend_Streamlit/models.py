@@ -0,0 +1,76 @@
+"""Typed views of the backend's analysis responses, decoded once with msgspec"""
+import msgspec
+
+
+class Skills(msgspec.Struct, frozen=True):
+    required_skills_match: int | float = 0
+    preferred_skills_match: int | float = 0
+    critical_skills_missing: list[str] = []
+    skill_gaps_impact: str = ""
+
+
+class Experience(msgspec.Struct, frozen=True):
+    years_required: int | float = 0
+    years_candidate_has: int | float = 0
+    experience_relevance: str = ""
+    project_quality: str = ""
+
+
+class Analysis(msgspec.Struct, frozen=True):
+    candidate_name: str = ""
+    overall_fit_score: int | float = 0
+    fit_level: str = "NO_FIT"
+    recommendation: str | None = None
+    key_strengths: list[str] = []
+    major_concerns: list[str] = []
+    skills_assessment: Skills = msgspec.field(default_factory=Skills)
+    experience_fit: Experience = msgspec.field(default_factory=Experience)
+    hiring_decision_factors: dict[str, int | float] = {}
+
+
+class Result(msgspec.Struct, frozen=True):
+    resume_file: str = "Single Resume"
+    # Failed analyses come back as an error string, missing ones as null
+    analysis: Analysis | str | None = None
+
+
+class UploadResponse(msgspec.Struct, frozen=True):
+    analysis_results: list[Result] = []
+
+
+# strict=False accepts numbers sent as strings and similar drift from the model's output
+upload_response_decoder = msgspec.json.Decoder(UploadResponse, strict=False)
+result_decoder = msgspec.json.Decoder(Result, strict=False)
+
+
+def _result_or_error(raw):
+    """Convert one decoded result object, or an error Result if its analysis doesn't fit the schema"""
+    try:
+        return msgspec.convert(raw, Result, strict=False)
+    except msgspec.ValidationError as e:
+        name = raw.get("resume_file") if isinstance(raw, dict) else None
+        return Result(
+            resume_file=name if isinstance(name, str) else "Unknown resume",
+            analysis=f"Error: unexpected analysis format ({e})",
+        )
+
+
+def decode_result(line):
+    """Decode one NDJSON result line; a malformed analysis becomes an error Result instead of raising"""
+    try:
+        return result_decoder.decode(line)
+    except msgspec.ValidationError:
+        return _result_or_error(msgspec.json.decode(line))
+    except msgspec.DecodeError as e:
+        return Result(resume_file="Unknown resume", analysis=f"Error: unreadable result line ({e})")
+
+
+def decode_results(content):
+    """Decode an /upload/ response body into Results, turning malformed analyses into error Results"""
+    try:
+        return upload_response_decoder.decode(content).analysis_results
+    except msgspec.ValidationError:
+        # Only the failing entries are degraded; the rest keep their analyses
+        raw = msgspec.json.decode(content)
+        items = raw.get("analysis_results") if isinstance(raw, dict) else None
+        return [_result_or_error(item) for item in items] if isinstance(items, list) else []
@@ -0,0 +1,139 @@
+"""Result rendering shared by the Streamlit pages"""
+from html import escape
+from pathlib import Path
+
+import streamlit as st
+
+from models import Analysis
+
+# Read once per process; Streamlit reruns the page script, not this module
+STYLES = Path(__file__).with_name("styles.css").read_text()
+
+# Fit level colors; anything else, including NO_FIT, is red
+FIT_COLOR = {"HIGH_FIT": "green", "MEDIUM_FIT": "orange"}
+
+
+def inject_styles():
+    """Add the page's CSS"""
+    st.markdown(f"<style>{STYLES}</style>", unsafe_allow_html=True)
+
+
+def skill_bar(label, value, color):
+    """HTML for a labelled percentage bar"""
+    # Kept on unindented lines: Markdown would render indented lines as code
+    return (
+        f"<p><strong>{escape(str(label))}: {value}%</strong></p>"
+        f'<div class="skill-bar"><div class="skill-fill" style="width:{value}%; background-color:{color}">{value}%</div></div>'
+    )
+
+
+def _bullets(items):
+    """HTML list of escaped items"""
+    return "<ul>" + "".join(f"<li>{escape(str(item))}</li>" for item in items) + "</ul>"
+
+
+def _summary_html(analysis):
+    """Fit level, overall score, recommendation, strengths and concerns"""
+    fit_level = analysis.fit_level
+    return (
+        f"<p><strong>Fit Level:</strong> <span style='color:{FIT_COLOR.get(fit_level, 'red')}; font-weight:bold'>{escape(fit_level)}</span></p>"
+        + skill_bar("Overall Fit", analysis.overall_fit_score, "#1f77b4")
+        + f"<p><strong>Recommendation:</strong> {escape(str(analysis.recommendation))}</p>"
+        + f"<details><summary>Key Strengths</summary>{_bullets(analysis.key_strengths)}</details>"
+        + f"<details><summary>Major Concerns</summary>{_bullets(analysis.major_concerns)}</details>"
+    )
+
+
+def _skills_html(analysis):
+    """Required and preferred skill match, and the missing critical skills"""
+    skills = analysis.skills_assessment
+    html = (
+        skill_bar("Required Skills Match", skills.required_skills_match, "#1f77b4")
+        + skill_bar("Preferred Skills Match", skills.preferred_skills_match, "#1f77b4")
+    )
+    if skills.critical_skills_missing:
+        html += _bullets([f"Missing Critical Skills: {', '.join(skills.critical_skills_missing)}"])
+    return html
+
+
+def _experience_html(analysis):
+    """Candidate years against the JD minimum, relevance and project quality"""
+    exp = analysis.experience_fit
+    exp_percent = min(100, int((exp.years_candidate_has / max(1, exp.years_required)) * 100))
+    return skill_bar("Experience Fit", exp_percent, "#ff7f0e") + _bullets([
+        f"Experience Relevance: {exp.experience_relevance}",
+        f"Project Quality: {exp.project_quality}",
+    ])
+
+
+def _factors_html(analysis):
+    """One bar per hiring decision factor"""
+    return "".join(skill_bar(factor, score, "#2ca02c") for factor, score in analysis.hiring_decision_factors.items())
+
+
+# The sections of a result card in order: (heading or None, HTML builder).
+# A section whose builder returns "" is left out along with its heading.
+SECTIONS = [
+    (None, _summary_html),
+    ("Skills Assessment", _skills_html),
+    ("Experience Fit", _experience_html),
+    ("Hiring Decision Factors", _factors_html),
+]
+
+
+def render_analysis(resume_name, analysis):
+    """Render one resume's models.Analysis"""
+    # Build the whole card as one HTML string and send it with a single
+    # st.markdown call, instead of a separate element per line and bar
+    parts = [f"<h2>{escape(str(resume_name))}</h2>"]
+    for heading, build in SECTIONS:
+        html = build(analysis)
+        if html:
+            parts.append(f"<h3>{heading}</h3>{html}" if heading else html)
+    st.markdown("\n".join(parts), unsafe_allow_html=True)
+
+
+def render_result(res):
+    """Render a models.Result: its analysis card, or the error it carries instead"""
+    if isinstance(res.analysis, Analysis):
+        render_analysis(res.resume_file, res.analysis)
+    else:
+        st.error(f"{res.resume_file}: {res.analysis or 'No analysis returned'}")
+
+
+def results_frame(results):
+    """One row per models.Result with the headline figures of its analysis"""
+    # Imported here so single-resume sessions never pay pandas' import time
+    import pandas as pd
+
+    rows = []
+    for res in results:
+        analysis = res.analysis
+        if not isinstance(analysis, Analysis):
+            rows.append({"Resume": res.resume_file, "Recommendation": analysis or "No analysis returned"})
+            continue
+        rows.append({
+            "Resume": res.resume_file,
+            "Score": analysis.overall_fit_score,
+            "Fit Level": analysis.fit_level,
+            "Recommendation": analysis.recommendation,
+            "Required Skills %": analysis.skills_assessment.required_skills_match,
+            "Preferred Skills %": analysis.skills_assessment.preferred_skills_match,
+        })
+    return pd.DataFrame(rows)
+
+
+def render_results_table(results, key):
+    """Bulk results as one table; the full analysis is rendered only for the selected row"""
+    event = st.dataframe(
+        results_frame(results),
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=key,
+    )
+    if event.selection.rows:
+        res = results[event.selection.rows[0]]
+        render_result(res)
+    else:
+        st.caption("Select a row to see the full analysis.")